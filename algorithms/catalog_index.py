@@ -0,0 +1,54 @@
+# algorithms/catalog_index.py
+from typing import Dict, List, Optional, Tuple
+
+
+class CatalogIndex:
+    """
+    Catálogo indexado, construido UNA vez al cargar:
+      - id -> producto (hash, O(1))
+      - vistas por (categoría, orden) ya filtradas y ordenadas por precio
+      - lista de categorías cacheada
+
+    Las vistas son tuplas inmutables compartidas por todos los usuarios,
+    así que paginar es solo un slice de tamaño página.
+    """
+
+    def __init__(self, products: List[dict], version: int = 1):
+        self.version = version
+        self.products: Tuple[dict, ...] = tuple(products)
+        self.by_id: Dict[str, dict] = {str(p["id"]): p for p in self.products}
+
+        by_category: Dict[str, List[dict]] = {}
+        for p in self.products:
+            by_category.setdefault(p.get("categoria", "Otros"), []).append(p)
+
+        self.categories: Tuple[str, ...] = ("Todos",) + tuple(sorted(by_category))
+
+        self._views: Dict[Tuple[str, Optional[str]], Tuple[dict, ...]] = {}
+        self._add_views("Todos", self.products)
+        for cat, items in by_category.items():
+            self._add_views(cat, items)
+
+    def _add_views(self, category: str, items):
+        self._views[(category, None)] = tuple(items)
+        self._views[(category, "asc")] = tuple(sorted(items, key=lambda p: p["precio"]))
+        self._views[(category, "desc")] = tuple(sorted(items, key=lambda p: p["precio"], reverse=True))
+
+    # ------------------------
+    # Consultas
+    # ------------------------
+    def get(self, pid) -> Optional[dict]:
+        return self.by_id.get(str(pid))
+
+    def view(self, category: str, sort_state: Optional[str] = None) -> Tuple[dict, ...]:
+        return self._views.get((category, sort_state), ())
+
+    def count(self, category: str) -> int:
+        return len(self.view(category))
+
+    def page(self, category: str, sort_state: Optional[str], page: int, size: int) -> Tuple[dict, ...]:
+        start = page * size
+        return self.view(category, sort_state)[start:start + size]
+
+    def __len__(self):
+        return len(self.products)
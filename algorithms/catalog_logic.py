@@ -1,4 +1,3 @@
-import json
 import os
 
 from whatsapp_service import (
@@ -9,54 +8,61 @@ from whatsapp_service import (
 
 # IMPORTS CORRECTOS
 from algorithms.users_and_cart import UserManager
+from algorithms.catalog_reloader import CatalogReloader
+from algorithms.menu_cache import MenuPageCache
 from utils.cart_management import CartManager
+from utils.order_archive import ORDER_ARCHIVE
+from utils.session_store import SESSION_STORE
 
 # instancias globales
-USERS = UserManager()
-CART = CartManager()
+USERS = UserManager(
+    store=SESSION_STORE,
+    # carrito con cosas: se guarda antes de soltarlo de memoria
+    on_evict=lambda u: SESSION_STORE.mark_dirty(u.phone, u.to_dict()),
+)
+CART = CartManager(
+    archive=ORDER_ARCHIVE,
+    id_offset=int(os.getenv("WORKER_INDEX", 0)),
+    id_step=int(os.getenv("WORKER_COUNT", 1)),
+)
 
 BASE_DIR = os.path.dirname(os.path.dirname(__file__))
-CATALOG_PATH = os.path.join(BASE_DIR, "data", "catalog.json")
+CATALOG_PATH = os.getenv("CATALOG_PATH", os.path.join(BASE_DIR, "data", "catalog.json"))
 
 PAGE_SIZE = 5
 
 # ================ CARGAR CATALOGO =================
 
-with open(CATALOG_PATH, "r", encoding="utf-8") as f:
-    PRODUCTS = json.load(f)
+# índices (id, categoría, orden); se reemplazan enteros al recargar
+CATALOG_STORE = CatalogReloader(CATALOG_PATH)
+
+# páginas del menú ya renderizadas, compartidas entre usuarios
+MENU_CACHE = MenuPageCache(maxsize=256)
+
+
+def get_catalog():
+    """Snapshot vigente: tomarlo una vez por request y usar siempre ese."""
+    return CATALOG_STORE.current
 
 
 def find_product(pid):
-    for p in PRODUCTS:
-        if str(p["id"]) == str(pid):
-            return p
-    return None
+    return get_catalog().get(pid)
 
 
 # ================ UTILIDADES =================
 
 def get_categories():
-    cats = sorted({p.get("categoria", "Otros") for p in PRODUCTS})
-    return ["Todos"] + cats
-
-
-def filter_products(category):
-    if category == "Todos":
-        return PRODUCTS
-    return [p for p in PRODUCTS if p.get("categoria") == category]
+    return list(get_catalog().categories)
 
 
-def sort_products(products, sort_state):
-    if sort_state == "asc":
-        return sorted(products, key=lambda p: p["precio"])
-    if sort_state == "desc":
-        return sorted(products, key=lambda p: p["precio"], reverse=True)
-    return products
+def filter_products(category, sort_state=None):
+    """Vista compartida (tupla inmutable) ya filtrada y ordenada."""
+    return get_catalog().view(category, sort_state)
 
 
 # ================ SECCIONES DEL MENÚ =================
 
-def make_menu_sections(products_page, user):
+def make_menu_sections(products_page, sort_state, page, total):
     rows = []
 
     for p in products_page:
@@ -75,9 +81,9 @@ def make_menu_sections(products_page, user):
     })
 
     sort_label = "Ordenar (precio)"
-    if user.sort == "asc":
+    if sort_state == "asc":
         sort_label += " ↑"
-    elif user.sort == "desc":
+    elif sort_state == "desc":
         sort_label += " ↓"
 
     controls.append({
@@ -86,9 +92,7 @@ def make_menu_sections(products_page, user):
         "description": "Ascendente / Descendente"
     })
 
-    page = user.page
-
-    if (page + 1) * PAGE_SIZE < len(user._filtered):
+    if (page + 1) * PAGE_SIZE < total:
         controls.append({
             "id": f"ctl_next_{page+1}",
             "title": "➡ Siguientes",
@@ -108,25 +112,34 @@ def make_menu_sections(products_page, user):
     ]
 
 
+def render_menu_page(catalog, category, sort_state, page):
+    """(body, sections) de una página; cacheado por (categoría, orden, página)."""
+    def build():
+        page_items = catalog.page(category, sort_state, page, PAGE_SIZE)
+        sections = make_menu_sections(page_items, sort_state, page, catalog.count(category))
+        return f"Página {page+1} — Categoría {category}", sections
+
+    return MENU_CACHE.get_or_build(catalog.version, (category, sort_state, page), build)
+
+
 # ================ ENVÍO DEL CATÁLOGO =================
 
 def send_product_menu(number: str):
     user = USERS.get(number)
 
-    filtered = filter_products(user.category)
-    sorted_products = sort_products(filtered, user.sort)
-
-    user._filtered = sorted_products
+    catalog = get_catalog()
 
-    start = user.page * PAGE_SIZE
-    page_items = sorted_products[start:start + PAGE_SIZE]
+    # el catálogo pudo achicarse (recarga): no quedar en una página vacía
+    last_page = max(0, (catalog.count(user.category) - 1) // PAGE_SIZE)
+    if user.page > last_page:
+        user.page = last_page
 
-    sections = make_menu_sections(page_items, user)
+    body, sections = render_menu_page(catalog, user.category, user.sort, user.page)
 
     return send_whatsapp_list(
         number,
         header="Menú del Restaurante",
-        body=f"Página {user.page+1} — Categoría {user.category}",
+        body=body,
         sections=sections
     )
 
@@ -0,0 +1,86 @@
+# algorithms/catalog_reloader.py
+import asyncio
+import json
+import os
+import threading
+from typing import Optional
+
+from algorithms.catalog_index import CatalogIndex
+
+
+class CatalogReloader:
+    """
+    Dueño del catálogo vigente. Recarga `catalog.json` sin reiniciar:
+
+    - el parseo y la construcción de índices corren en un thread aparte,
+      fuera del event loop;
+    - el nuevo CatalogIndex se publica con una sola asignación (swap
+      atómico), así que quien ya tomó `current` sigue con un snapshot
+      consistente hasta terminar su request;
+    - si el archivo está roto se conserva el catálogo anterior (y no se
+      vuelve a intentar hasta que el archivo cambie de nuevo).
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._mtime = self._stat_mtime()
+        self.current: CatalogIndex = CatalogIndex(self._read(), version=1)
+        self.last_error: Optional[str] = None
+
+    # ------------------------
+    # Carga
+    # ------------------------
+    def _stat_mtime(self) -> Optional[float]:
+        try:
+            return os.stat(self.path).st_mtime
+        except OSError:
+            return None
+
+    def _read(self):
+        with open(self.path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def reload(self) -> bool:
+        """Reconstruye los índices y los publica. Devuelve True si cambió."""
+        with self._lock:
+            mtime = self._stat_mtime()
+            try:
+                new_catalog = CatalogIndex(self._read(), version=self.current.version + 1)
+            except (OSError, ValueError, KeyError, TypeError) as e:
+                # este mtime ya se intentó: el watcher no reintenta hasta que cambie
+                self._mtime = mtime
+                self.last_error = str(e)
+                print("⚠️ Catálogo no recargado:", e)
+                return False
+
+            self.current = new_catalog
+            self._mtime = mtime
+            self.last_error = None
+            print(f"🔄 Catálogo recargado: v{new_catalog.version}, {len(new_catalog)} productos")
+            return True
+
+    async def reload_async(self) -> bool:
+        return await asyncio.to_thread(self.reload)
+
+    # ------------------------
+    # Watcher
+    # ------------------------
+    def changed_on_disk(self) -> bool:
+        mtime = self._stat_mtime()
+        return mtime is not None and mtime != self._mtime
+
+    async def watch(self, interval: float = 5.0):
+        """Loop de polling del mtime; pensado para correr como task."""
+        while True:
+            await asyncio.sleep(interval)
+            if self.changed_on_disk():
+                await self.reload_async()
+
+    def info(self) -> dict:
+        return {
+            "path": self.path,
+            "version": self.current.version,
+            "products": len(self.current),
+            "last_error": self.last_error,
+        }
@@ -0,0 +1,65 @@
+# algorithms/courier_pool.py
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+from utils.geo_calculator import distances_from
+
+
+class CourierPool:
+    """
+    Deliveries libres.
+
+    - acquire() / release() / remove(): O(1) (OrderedDict como cola FIFO:
+      sale el que lleva más tiempo libre).
+    - acquire_nearest(lat, lon): el libre más cercano a un punto según su
+      última posición conocida; una sola pasada vectorizada sobre los
+      libres con posición. Si ninguno tiene posición, cae a FIFO.
+    """
+
+    def __init__(self, geo_mode: str = "haversine"):
+        self.geo_mode = geo_mode
+        self._idle: "OrderedDict[str, None]" = OrderedDict()
+        self.positions: Dict[str, Tuple[float, float, float]] = {}  # id -> (lat, lon, ts)
+
+    def __len__(self):
+        return len(self._idle)
+
+    def __contains__(self, delivery_id):
+        return delivery_id in self._idle
+
+    def __iter__(self):
+        """Libres, del que lleva más tiempo al más reciente."""
+        return iter(self._idle)
+
+    def release(self, delivery_id: str):
+        """Marca como libre (al final de la cola)."""
+        if delivery_id not in self._idle:
+            self._idle[delivery_id] = None
+
+    def remove(self, delivery_id: str):
+        self._idle.pop(delivery_id, None)
+
+    def acquire(self) -> Optional[str]:
+        if not self._idle:
+            return None
+        delivery_id, _ = self._idle.popitem(last=False)
+        return delivery_id
+
+    def update_position(self, delivery_id: str, lat: float, lon: float, ts: Optional[float] = None):
+        self.positions[delivery_id] = (lat, lon, time.time() if ts is None else ts)
+
+    def acquire_nearest(self, lat: float, lon: float) -> Optional[str]:
+        candidates = [d for d in self._idle if d in self.positions]
+        if not candidates:
+            return self.acquire()
+
+        dists = distances_from(
+            lat, lon,
+            [self.positions[d][0] for d in candidates],
+            [self.positions[d][1] for d in candidates],
+            self.geo_mode,
+        )
+        delivery_id = candidates[int(dists.argmin())]
+        del self._idle[delivery_id]
+        return delivery_id
@@ -0,0 +1,72 @@
+# algorithms/delivery_analytics.py
+import time
+from typing import Callable, Dict, Optional, Tuple
+
+from structures.streaming_stats import RollingWindow
+
+# nombre -> (duración en segundos, cantidad de baldes)
+WINDOWS = {
+    "15m": (15 * 60, 15),
+    "1h": (60 * 60, 12),
+    "24h": (24 * 60 * 60, 24),
+}
+
+FIELDS = ("orders", "km", "liters")
+SKETCH_FIELDS = ("wait_min", "delivery_min")
+
+
+class DeliveryAnalytics:
+    """
+    Métricas en vivo de entregas por zona y por delivery (y global), en
+    ventanas deslizantes de 15 min, 1 h y 24 h:
+
+      orders, km, liters            -> sumas
+      wait_min      = assigned_at - enqueued_at   -> p50 / p90
+      delivery_min  = delivered_at - enqueued_at  -> p50 / p90
+
+    observe() es O(1) por ventana; snapshot() no recorre el historial.
+    """
+
+    def __init__(self, clock: Callable[[], float] = time.time):
+        self.clock = clock
+        self._series: Dict[Tuple[str, str], Dict[str, RollingWindow]] = {}
+
+    def _windows(self, key: Tuple[str, str]) -> Dict[str, RollingWindow]:
+        windows = self._series.get(key)
+        if windows is None:
+            windows = self._series[key] = {
+                name: RollingWindow(span, buckets, FIELDS, SKETCH_FIELDS)
+                for name, (span, buckets) in WINDOWS.items()
+            }
+        return windows
+
+    def observe(self, order, delivery_id: str, km: float, liters: float):
+        ts = order.delivered_at or self.clock()
+        enq = order.enqueued_at
+        asg = order.assigned_at
+        values = {"orders": 1, "km": km, "liters": liters}
+        samples = {
+            "wait_min": (asg - enq) / 60 if enq is not None and asg is not None else None,
+            "delivery_min": (ts - enq) / 60 if enq is not None else None,
+        }
+
+        keys = [("all", "all"), ("courier", delivery_id)]
+        if order.zone is not None:
+            keys.append(("zone", order.zone))
+        for key in keys:
+            for window in self._windows(key).values():
+                window.add(ts, values, samples)
+
+    def snapshot(self, now: Optional[float] = None) -> dict:
+        """Copia serializable a JSON; no expone estado interno."""
+        now = self.clock() if now is None else now
+        out = {"all": {}, "zones": {}, "couriers": {}}
+        for (kind, name), windows in self._series.items():
+            summary = {w: rw.summary(now) for w, rw in windows.items()}
+            if kind == "all":
+                out["all"] = summary
+            elif kind == "zone":
+                out["zones"][name] = summary
+            else:
+                out["couriers"][name] = summary
+        return out
@@ -0,0 +1,191 @@
+# algorithms/delivery_ipc.py
+"""
+DeliveryManager como proceso dueño único, accesible por IPC local.
+
+Los workers del cluster (cluster.py) comparten las tandas y los deliveries:
+el estado vive en un solo proceso (este) y los demás le hablan con un
+proxy de multiprocessing.managers.
+
+    python -m algorithms.delivery_ipc     # usa DELIVERY_IPC_ADDRESS y DELIVERY_IPC_AUTHKEY
+
+El servidor de managers deserializa (pickle) lo que le mandan los
+clientes: sin DELIVERY_IPC_AUTHKEY no arranca ni se conecta. cluster.py
+genera una clave aleatoria y se la pasa al dueño y a los workers.
+
+En main.py, si DELIVERY_IPC_ADDRESS está definida, DELIVERY_MANAGER es un
+proxy (connect_delivery_manager) en vez de la instancia local.
+"""
+import os
+import signal
+import sys
+import threading
+import time
+from multiprocessing.managers import BaseManager
+
+DELIVERY_IPC_ADDRESS = os.getenv("DELIVERY_IPC_ADDRESS", "127.0.0.1:50055")
+
+
+def _authkey() -> bytes:
+    key = os.getenv("DELIVERY_IPC_AUTHKEY")
+    if not key:
+        raise RuntimeError("DELIVERY_IPC_AUTHKEY no definida (cluster.py genera una)")
+    return key.encode()
+
+
+def parse_address(address: str):
+    """"host:puerto" -> tupla TCP; cualquier otra cosa, ruta de socket unix."""
+    host, sep, port = address.rpartition(":")
+    if sep and port.isdigit():
+        return host or "127.0.0.1", int(port)
+    return address
+
+
+class DeliveryService:
+    """
+    Fachada thread-safe sobre DeliveryManager: el servidor de managers
+    atiende cada conexión en su propio thread, así que toda llamada (y el
+    scheduler de tandas) pasa por el mismo lock. Los resultados viajan
+    copiados (pickle), nunca como referencias al estado interno.
+    """
+
+    def __init__(self, manager, scheduler=None):
+        self.manager = manager
+        self.scheduler = scheduler
+        self._lock = threading.Lock()
+
+    def register_delivery(self, delivery_id: str):
+        with self._lock:
+            return self.manager.register_delivery(delivery_id)
+
+    def is_courier(self, number: str) -> bool:
+        with self._lock:
+            return self.manager.is_courier(number)
+
+    def update_delivery_position(self, delivery_id: str, lat: float, lon: float) -> bool:
+        with self._lock:
+            return self.manager.update_delivery_position(delivery_id, lat, lon)
+
+    def enqueue_order(self, order):
+        with self._lock:
+            return self.manager.enqueue_order(order)
+
+    def verify_and_mark_delivered(self, delivery_id: str, code: str) -> bool:
+        with self._lock:
+            return self.manager.verify_and_mark_delivered(delivery_id, code)
+
+    def max_order_id(self) -> int:
+        with self._lock:
+            return self.manager.max_order_id()
+
+    def get_tanda_info(self, tanda_id: int):
+        with self._lock:
+            return self.manager.get_tanda_info(tanda_id)
+
+    def get_pending_counts(self):
+        with self._lock:
+            return self.manager.get_pending_counts()
+
+    def get_stats(self):
+        with self._lock:
+            return self.manager.get_stats()
+
+    def get_live_stats(self):
+        with self._lock:
+            return self.manager.get_live_stats()
+
+    # ------------------------
+    # Tareas de fondo del proceso dueño
+    # ------------------------
+    def run_scheduler(self, stop: threading.Event, max_sleep: float = 0.5):
+        """Versión con thread de TandaScheduler.run (aquí no hay event loop)."""
+        while not stop.is_set():
+            with self._lock:
+                self.scheduler.run_due()
+                deadline = self.scheduler.next_deadline()
+            delay = max_sleep if deadline is None else min(max_sleep, max(0.0, deadline - self.scheduler.clock()))
+            stop.wait(delay)
+
+    def run_write_behind(self, archive, stop: threading.Event, interval: float = 5.0):
+        while not stop.wait(interval):
+            try:
+                archive.flush()
+            except Exception as e:
+                print("⚠️ Error escribiendo el archivo de pedidos:", e)
+            with self._lock:
+                eta_model = self.manager.eta.export_if_dirty()
+            if eta_model is not None:
+                self.manager.eta.write(eta_model)
+            # fuera del lock: no toca el estado en memoria
+            try:
+                self.manager.write_snapshot()
+            except Exception as e:
+                print("⚠️ Error guardando el snapshot de entregas:", e)
+
+    def shutdown(self, archive):
+        with self._lock:
+            self.manager.close()
+        archive.close()
+
+
+class DeliveryIPCManager(BaseManager):
+    pass
+
+
+def serve(address: str = DELIVERY_IPC_ADDRESS):
+    try:
+        authkey = _authkey()
+    except RuntimeError as e:
+        sys.exit(f"❌ {e}")
+
+    from algorithms.delivery_manager import DELIVERY_MANAGER, TANDA_SCHEDULER
+    from utils.order_archive import ORDER_ARCHIVE
+
+    service = DeliveryService(DELIVERY_MANAGER, TANDA_SCHEDULER)
+    stop = threading.Event()
+    threads = [
+        threading.Thread(target=service.run_scheduler, args=(stop,), daemon=True),
+        threading.Thread(target=service.run_write_behind, args=(ORDER_ARCHIVE, stop), daemon=True),
+    ]
+    for t in threads:
+        t.start()
+
+    DeliveryIPCManager.register("get_delivery_manager", callable=lambda: service)
+    manager = DeliveryIPCManager(address=parse_address(address), authkey=authkey)
+    server = manager.get_server()
+
+    def _terminate(*_):
+        raise KeyboardInterrupt
+
+    signal.signal(signal.SIGTERM, _terminate)
+    print(f"🚚 DeliveryManager escuchando en {address}")
+    try:
+        server.serve_forever()
+    except (KeyboardInterrupt, SystemExit):
+        pass
+    finally:
+        stop.set()
+        service.shutdown(ORDER_ARCHIVE)
+
+
+def connect_delivery_manager(address: str = DELIVERY_IPC_ADDRESS, timeout: float = 30.0):
+    """
+    Proxy al DeliveryService remoto; reintenta mientras el dueño arranca.
+    Cada llamada es un round-trip bloqueante: desde el event loop, usar
+    asyncio.to_thread (el proxy abre una conexión por thread).
+    """
+    DeliveryIPCManager.register("get_delivery_manager")
+    manager = DeliveryIPCManager(address=parse_address(address), authkey=_authkey())
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            manager.connect()
+            break
+        except (ConnectionRefusedError, FileNotFoundError):
+            if time.monotonic() > deadline:
+                raise
+            time.sleep(0.2)
+    return manager.get_delivery_manager()
+
+
+if __name__ == "__main__":
+    serve()
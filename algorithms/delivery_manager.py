@@ -1,22 +1,24 @@
 # algorithms/delivery_manager.py
+import os
+import threading
 import time
 import random
 import string
 from collections import deque
-from math import radians, sin, cos, sqrt, atan2
-from typing import Dict, List, Optional, Any
-
-# ------------------------
-# UTIL: haversine
-# ------------------------
-def haversine_km(lat1, lon1, lat2, lon2):
-    R = 6371.0
-    rlat1, rlon1, rlat2, rlon2 = map(radians, [lat1, lon1, lat2, lon2])
-    dlat = rlat2 - rlat1
-    dlon = rlon2 - rlon1
-    a = sin(dlat/2)**2 + cos(rlat1)*cos(rlat2)*sin(dlon/2)**2
-    c = 2 * atan2(sqrt(a), sqrt(1-a))
-    return R * c
+from typing import Callable, Dict, List, Optional, Any
+
+from algorithms.courier_pool import CourierPool
+from algorithms.delivery_analytics import DeliveryAnalytics
+from algorithms.eta_estimator import EtaEstimator
+from algorithms.route_planner import plan_route
+from algorithms.tanda_scheduler import TandaScheduler
+from algorithms.zoning import ZoneIndex, QuadrantZoneIndex, load_zone_index
+from structures.data_models import Order
+from structures.ring_buffer import SpillingRingBuffer
+from structures.trees_and_queues import ZoneQueue
+from utils.dispatch_journal import DispatchJournal
+from utils.geo_calculator import distance_km
+from utils.order_archive import ORDER_ARCHIVE
 
 # ------------------------
 # CONSTANTS & CONFIG
@@ -28,66 +30,86 @@ KM_TO_MIN = 2.0  # convertir km a minutos estimados
 BASE_PREP_MIN = 10  # tiempo base
 LITERS_PER_KM = 0.1  # 1 L cada 10 km -> 0.1 L/km
 
+BASE_DIR = os.path.dirname(os.path.dirname(__file__))
+# "haversine" o "equirect" (más barata, suficiente dentro de la ciudad)
+GEO_MODE = os.getenv("GEO_MODE", "haversine")
+# asignación de tandas: "fifo" (el que lleva más tiempo libre) o "nearest"
+ASSIGN_MODE = os.getenv("ASSIGN_MODE", "fifo")
+ZONES_CONFIG_PATH = os.getenv("ZONES_CONFIG", os.path.join(BASE_DIR, "data", "zones.json"))
+# historial caliente en memoria; lo más viejo va al archivo en disco
+COMPLETED_HOT_MAX = int(os.getenv("COMPLETED_HOT_MAX", 1000))
+TANDAS_HOT_MAX = int(os.getenv("TANDAS_HOT_MAX", 200))
+ETA_MODEL_PATH = os.getenv("ETA_MODEL_PATH", os.path.join(BASE_DIR, "data", "eta_model.json"))
+# journal de transiciones + snapshots ("" lo desactiva)
+DISPATCH_JOURNAL_DIR = os.getenv("DISPATCH_JOURNAL_DIR", os.path.join(BASE_DIR, "data", "journal"))
+# cada cuántos eventos se toma un snapshot (acota el tail a reproducir)
+SNAPSHOT_EVERY = int(os.getenv("DISPATCH_SNAPSHOT_EVERY", 2000))
+
 # ------------------------
 # Helpers
 # ------------------------
+def prior_eta_min(dist_km: float, queue_len: int) -> float:
+    """Fórmula fija, usada mientras el estimador no tiene historial."""
+    return BASE_PREP_MIN + dist_km * KM_TO_MIN + queue_len * 5
+
 def generate_code(length=6):
     return ''.join(random.choices(string.ascii_uppercase + "23456789", k=length))
 
-def zone_from_coords(lat, lon, center=RESTAURANT_COORDS):
-    lat_c, lon_c = center
-    if lat >= lat_c and lon >= lon_c:
-        return "NE"
-    if lat >= lat_c and lon < lon_c:
-        return "NO"
-    if lat < lat_c and lon >= lon_c:
-        return "SE"
-    return "SO"
-
-# ------------------------
-# BST helper
-# ------------------------
-class BSTNode:
-    def __init__(self, order: dict):
-        self.order = order
-        self.left: Optional['BSTNode'] = None
-        self.right: Optional['BSTNode'] = None
-
-def build_balanced_bst(sorted_orders: List[dict]) -> Optional[BSTNode]:
-    if not sorted_orders:
-        return None
-    mid = len(sorted_orders) // 2
-    root = BSTNode(sorted_orders[mid])
-    root.left = build_balanced_bst(sorted_orders[:mid])
-    root.right = build_balanced_bst(sorted_orders[mid+1:])
-    return root
-
-def inorder_traversal(node: Optional[BSTNode], out: List[dict]):
-    if not node:
-        return
-    inorder_traversal(node.left, out)
-    out.append(node.order)
-    inorder_traversal(node.right, out)
-
 # ------------------------
 # DeliveryManager
 # ------------------------
 class DeliveryManager:
-    def __init__(self):
+    def __init__(self, clock: Callable[[], float] = time.time,
+                 zone_index: Optional[ZoneIndex] = None,
+                 assign_mode: str = ASSIGN_MODE,
+                 eta: Optional[EtaEstimator] = None,
+                 archive=None,
+                 journal: Optional[DispatchJournal] = None,
+                 snapshot_every: int = SNAPSHOT_EVERY,
+                 defer_snapshots: bool = False):
+        self.clock = clock
+        self.archive = archive
+        self.journal = journal
+        self.snapshot_every = snapshot_every
+        # con defer_snapshots la escritura del snapshot la hace write_snapshot()
+        # desde el write-behind, no la operación que lo dispara
+        self.defer_snapshots = defer_snapshots
+        self._since_snapshot = 0
+        self._pending_snapshot = None
+        self._snapshot_lock = threading.Lock()
+        self._snapshot_write_lock = threading.Lock()
+        self._replaying = False
+        self.assign_mode = assign_mode
+        self.eta = eta or EtaEstimator(prior_eta_min, clock=clock)
+        self.scheduler: Optional[TandaScheduler] = None
+        self.zone_index: ZoneIndex = zone_index or QuadrantZoneIndex(RESTAURANT_COORDS)
         self.deliveries: Dict[str, Dict[str, Any]] = {}
-        self.zone_queues: Dict[str, deque] = {
-            "NE": deque(), "NO": deque(), "SE": deque(), "SO": deque()
-        }
+        # código de entrega -> pedido activo (pendiente o en tanda, sin entregar)
+        self.active_codes: Dict[str, dict] = {}
+        self.idle_couriers = CourierPool(GEO_MODE)
+        # una cola por zona, creada la primera vez que llega un pedido ahí
+        self.zone_queues: Dict[str, ZoneQueue] = {}
         self.pending_tandas: deque = deque()
         self.tandas: Dict[int, Dict[str, Any]] = {}
         self._next_tanda_id = 1
-        self.completed_orders: List[dict] = []
+        # mayor id de pedido visto (en vivo o reproducido): tras un crash el
+        # CartManager sigue desde acá, aunque el archivo no lo tenga
+        self._max_order_id = 0
+        self.completed_orders = SpillingRingBuffer(
+            COMPLETED_HOT_MAX, key_fn=lambda o: o.id, spill=self._archive_order
+        )
+        # tandas terminadas: las más viejas salen de self.tandas al archivo
+        self._completed_tandas = SpillingRingBuffer(
+            TANDAS_HOT_MAX, key_fn=lambda t: t["id"], spill=self._archive_tanda
+        )
         self.stats = {
             "total_dispatched_orders": 0,
             "distance_by_delivery": {},
             "liters_by_delivery": {},
             "orders_by_delivery": {},
         }
+        # ventanas deslizantes por zona / delivery (vista en vivo)
+        self.analytics = DeliveryAnalytics(clock)
 
     # ------------------------
     # Registro
@@ -96,122 +118,252 @@ class DeliveryManager:
         if not delivery_id:
             return
         if delivery_id not in self.deliveries:
-            self.deliveries[delivery_id] = {
-                "status": "available",
-                "assigned_tanda": None,
-                "stats": {
-                    "distance": 0.0,
-                    "orders_delivered": 0,
-                }
+            self._apply_registered(delivery_id)
+            self._log("registered", courier=delivery_id)
+            self._maybe_snapshot()
+
+    def _apply_registered(self, delivery_id: str):
+        self.deliveries[delivery_id] = {
+            "status": "available",
+            "assigned_tanda": None,
+            "stats": {
+                "distance": 0.0,
+                "orders_delivered": 0,
             }
+        }
+        self.idle_couriers.release(delivery_id)
 
     def set_delivery_available(self, delivery_id: str):
         if delivery_id in self.deliveries:
-            self.deliveries[delivery_id]["status"] = "available"
-            self.deliveries[delivery_id]["assigned_tanda"] = None
+            self._apply_available(delivery_id)
+            self._log("available", courier=delivery_id)
             self._try_assign_tandas()
+            self._maybe_snapshot()
+
+    def _apply_available(self, delivery_id: str):
+        self.deliveries[delivery_id]["status"] = "available"
+        self.deliveries[delivery_id]["assigned_tanda"] = None
+        self.idle_couriers.release(delivery_id)
 
     def set_delivery_busy(self, delivery_id: str, tanda_id: int):
         if delivery_id in self.deliveries:
-            self.deliveries[delivery_id]["status"] = "busy"
-            self.deliveries[delivery_id]["assigned_tanda"] = tanda_id
+            self._apply_busy(delivery_id, tanda_id)
+            self._log("busy", courier=delivery_id, tanda=tanda_id)
+            self._maybe_snapshot()
+
+    def _apply_busy(self, delivery_id: str, tanda_id: int):
+        self.deliveries[delivery_id]["status"] = "busy"
+        self.deliveries[delivery_id]["assigned_tanda"] = tanda_id
+        self.idle_couriers.remove(delivery_id)
+
+    def is_courier(self, number: str) -> bool:
+        return number in self.deliveries
+
+    def update_delivery_position(self, delivery_id: str, lat: float, lon: float) -> bool:
+        """Última posición conocida del delivery (para asignar por cercanía)."""
+        if delivery_id not in self.deliveries:
+            return False
+        self.idle_couriers.update_position(delivery_id, lat, lon, self.clock())
+        return True
 
     # ------------------------
     # Encolar orden
     # ------------------------
-    def enqueue_order(self, order: dict):
-        lat = order.get("lat")
-        lon = order.get("lon")
+    def enqueue_order(self, order: Order) -> Order:
+        lat = order.lat
+        lon = order.lon
 
         if lat is None or lon is None:
-            order["status"] = "pending_no_location"
+            order.status = "pending_no_location"
             return order
 
-        dist_km = round(haversine_km(
-            RESTAURANT_COORDS[0], RESTAURANT_COORDS[1], lat, lon
+        dist_km = round(distance_km(
+            RESTAURANT_COORDS[0], RESTAURANT_COORDS[1], lat, lon, GEO_MODE
         ), 2)
-        order["distance_km"] = dist_km
+        order.distance_km = dist_km
 
-        order_zone = zone_from_coords(lat, lon)
-        order["zone"] = order_zone
+        order_zone = self.zone_index.zone_for(lat, lon)
+        order.zone = order_zone
 
-        order["enqueued_at"] = time.time()
-        order["code"] = order.get("code") or generate_code()
-        order["status"] = "pending"
+        order.enqueued_at = self.clock()
+        code = (order.code or "").upper()
+        if not code or code in self.active_codes:
+            code = self.allocate_code()
+        order.code = code
 
-        queue_len = len(self.zone_queues[order_zone])
-        order["eta_min"] = int(BASE_PREP_MIN + dist_km * KM_TO_MIN + queue_len * 5)
+        queue = self.zone_queues.get(order_zone)
+        queue_len = len(queue) if queue else 0
+        order.eta_min, order.eta_p90_min = self.eta.estimate(order_zone, dist_km, queue_len)
 
-        self.zone_queues[order_zone].append(order)
+        self._apply_enqueued(order)
+        self._log("enqueued", order=order.to_dict())
 
         self._maybe_create_tanda(order_zone)
         self._try_assign_tandas()
+        self._maybe_snapshot()
 
         return order
 
+    def _apply_enqueued(self, order: Order):
+        self.active_codes[order.code] = order
+        self._max_order_id = max(self._max_order_id, order.id)
+        order.status = "pending"
+
+        queue = self.zone_queues.get(order.zone)
+        if queue is None:
+            queue = self.zone_queues[order.zone] = ZoneQueue(order.zone)
+        queue.enqueue(order)
+        if len(queue) == 1:
+            self._reschedule_zone(order.zone)
+
+    def allocate_code(self) -> str:
+        """Código sin colisión con ningún pedido activo."""
+        while True:
+            code = generate_code()
+            if code not in self.active_codes:
+                return code
+
+    # ------------------------
+    # Cancelar / consultar pendientes
+    # ------------------------
+    def cancel_order(self, order_id, zone: Optional[str] = None) -> Optional[Order]:
+        """Quita un pedido que todavía no salió en tanda. O(log n) por zona."""
+        zones = [zone] if zone else list(self.zone_queues)
+        for z in zones:
+            order = self._apply_cancelled(order_id, z)
+            if order is not None:
+                self._log("cancelled", id=order_id, zone=z)
+                self._maybe_snapshot()
+                return order
+        return None
+
+    def _apply_cancelled(self, order_id, zone: str) -> Optional[Order]:
+        q = self.zone_queues.get(zone)
+        order = q.cancel(order_id) if q else None
+        if order is not None:
+            order.status = "cancelled"
+            self.active_codes.pop(order.code, None)
+            self._reschedule_zone(zone)
+        return order
+
+    def max_order_id(self) -> int:
+        return self._max_order_id
+
+    def nearest_pending(self, zone: str, k: int) -> List[Order]:
+        q = self.zone_queues.get(zone)
+        return q.nearest(k) if q else []
+
     # ------------------------
     # Crear tanda
     # ------------------------
-    def _maybe_create_tanda(self, zone: str):
-        q = self.zone_queues[zone]
-        if not q:
+    def _maybe_create_tanda(self, zone: str, now: Optional[float] = None):
+        q = self.zone_queues.get(zone)
+        head = q.peek() if q else None
+        if head is None:
             return
 
-        wait = time.time() - q[0].get("enqueued_at", time.time())
+        now = self.clock() if now is None else now
+        expired = now >= (head.enqueued_at or now) + TANDA_MAX_WAIT_SECONDS
 
-        if len(q) >= TANDA_MAX or wait >= TANDA_MAX_WAIT_SECONDS:
+        if len(q) >= TANDA_MAX or expired:
 
-            items = []
-            for _ in range(min(TANDA_MAX, len(q))):
-                items.append(q.popleft())
+            items = q.dequeue_batch(TANDA_MAX)
 
             tanda_id = self._next_tanda_id
-            self._next_tanda_id += 1
-
-            items_sorted = sorted(items, key=lambda o: o["distance_km"])
-            root = build_balanced_bst(items_sorted)
 
-            ordered_list = []
-            inorder_traversal(root, ordered_list)
-
-            tanda = {
-                "id": tanda_id,
-                "zone": zone,
-                "orders": ordered_list,
-                "created_at": time.time(),
-                "assigned_to": None,
-                "status": "pending"
-            }
+            # recorrido optimizado (vecino más cercano + 2-opt / Or-opt)
+            plan = plan_route(RESTAURANT_COORDS, items, GEO_MODE)
+            legs = [round(leg, 3) for leg in plan.legs_km]
+            route_km = round(plan.total_km, 3)
+            created_at = self.clock()
+
+            self._apply_tanda(tanda_id, zone, plan.orders, legs, route_km, created_at)
+            self._log("tanda", id=tanda_id, zone=zone, orders=[o.id for o in plan.orders],
+                      legs=legs, route_km=route_km, at=created_at)
+
+            self._reschedule_zone(zone)
+
+    def _apply_tanda(self, tanda_id: int, zone: str, orders: List[Order],
+                     legs: List[float], route_km: float, created_at: float):
+        for order, leg in zip(orders, legs):
+            order.leg_km = leg
+            order.tanda_id = tanda_id
+
+        self.tandas[tanda_id] = {
+            "id": tanda_id,
+            "zone": zone,
+            "orders": orders,
+            # paradas sin entregar (dict usado como set ordenado, baja O(1))
+            "pending_codes": dict.fromkeys(o.code for o in orders),
+            "route_km": route_km,
+            "created_at": created_at,
+            "assigned_to": None,
+            "status": "pending"
+        }
+        self.pending_tandas.append(tanda_id)
+        self._next_tanda_id = max(self._next_tanda_id, tanda_id + 1)
 
-            self.tandas[tanda_id] = tanda
-            self.pending_tandas.append(tanda_id)
+    # ------------------------
+    # Regla de los 45 min (la dispara TandaScheduler)
+    # ------------------------
+    def _reschedule_zone(self, zone: str):
+        """Deadline de la zona = llegada de su pedido más viejo + espera máxima."""
+        if self.scheduler is None or self._replaying:
+            return
+        q = self.zone_queues.get(zone)
+        head = q.peek() if q else None
+        if head is not None:
+            self.scheduler.schedule(zone, head.enqueued_at + TANDA_MAX_WAIT_SECONDS)
+        else:
+            self.scheduler.cancel(zone)
+
+    def on_zone_deadline(self, zone: str, now: Optional[float] = None):
+        self._maybe_create_tanda(zone, now)
+        self._reschedule_zone(zone)
+        self._maybe_snapshot()
 
     # ------------------------
     # Asignar tandas
     # ------------------------
     def _try_assign_tandas(self):
-        if not self.pending_tandas:
-            return
-
-        available = [d for d, info in self.deliveries.items() if info["status"] == "available"]
-
-        while available and self.pending_tandas:
-            delivery_id = available.pop(0)
-            tanda_id = self.pending_tandas.popleft()
+        while self.idle_couriers and self.pending_tandas:
+            tanda_id = self.pending_tandas[0]
 
             tanda = self.tandas.get(tanda_id)
             if not tanda:
+                self.pending_tandas.popleft()
                 continue
 
-            tanda["assigned_to"] = delivery_id
-            tanda["status"] = "assigned"
-            tanda["assigned_at"] = time.time()
+            delivery_id = self._acquire_courier(tanda)
+            assigned_at = self.clock()
 
-            self.deliveries[delivery_id]["status"] = "busy"
-            self.deliveries[delivery_id]["assigned_tanda"] = tanda_id
+            self._apply_assigned(tanda_id, delivery_id, assigned_at)
+            self._log("assigned", tanda=tanda_id, courier=delivery_id, at=assigned_at)
 
-            self.stats["distance_by_delivery"].setdefault(delivery_id, 0.0)
-            self.stats["orders_by_delivery"].setdefault(delivery_id, 0)
+    def _apply_assigned(self, tanda_id: int, delivery_id: str, assigned_at: float):
+        # en vivo siempre es la primera de la cola: remove() no recorre nada
+        self.pending_tandas.remove(tanda_id)
+        self.idle_couriers.remove(delivery_id)
+
+        tanda = self.tandas[tanda_id]
+        tanda["assigned_to"] = delivery_id
+        tanda["status"] = "assigned"
+        tanda["assigned_at"] = assigned_at
+        for order in tanda["orders"]:
+            order.assigned_at = assigned_at
+
+        self.deliveries[delivery_id]["status"] = "busy"
+        self.deliveries[delivery_id]["assigned_tanda"] = tanda_id
+
+        self.stats["distance_by_delivery"].setdefault(delivery_id, 0.0)
+        self.stats["orders_by_delivery"].setdefault(delivery_id, 0)
+
+    def _acquire_courier(self, tanda: dict) -> str:
+        """O(1) en modo FIFO; en modo "nearest", el libre más cerca de la primera parada."""
+        if self.assign_mode == "nearest" and tanda["orders"]:
+            first = tanda["orders"][0]
+            return self.idle_couriers.acquire_nearest(first.lat, first.lon)
+        return self.idle_couriers.acquire()
 
     # ------------------------
     # Verificar entrega
@@ -220,26 +372,48 @@ class DeliveryManager:
         if delivery_id not in self.deliveries:
             return False
 
-        info = self.deliveries[delivery_id]
-        tanda_id = info.get("assigned_tanda")
-
-        if not tanda_id:
+        # cualquier parada de la tanda asignada, no solo la primera
+        code = code.upper()
+        current_order = self.active_codes.get(code)
+        if current_order is None:
             return False
 
+        tanda_id = current_order.tanda_id
         tanda = self.tandas.get(tanda_id)
-        if not tanda or not tanda["orders"]:
+        if not tanda or tanda.get("assigned_to") != delivery_id or code not in tanda["pending_codes"]:
             return False
 
-        current_order = tanda["orders"][0]
+        # km del tramo realmente recorrido: desde la parada anterior entregada
+        # (coincide con leg_km si se respeta la ruta planificada)
+        prev_lat, prev_lon = tanda.get("last_point") or RESTAURANT_COORDS
+        dist = round(distance_km(prev_lat, prev_lon, current_order.lat, current_order.lon, GEO_MODE), 3)
+        delivered_at = self.clock()
 
-        if current_order.get("code", "").upper() != code.upper():
-            return False
+        self._apply_delivered(current_order, tanda, delivery_id, delivered_at, dist)
+        self._log("delivered", code=code, courier=delivery_id, at=delivered_at, km=dist)
+
+        # el delivery está en la puerta del cliente: es su última posición conocida
+        if current_order.lat is not None:
+            self.idle_couriers.update_position(
+                delivery_id, current_order.lat, current_order.lon, delivered_at
+            )
 
-        current_order["status"] = "delivered"
-        current_order["delivered_at"] = time.time()
-        current_order["delivered_by"] = delivery_id
+        self.eta.observe(current_order)
+        self.analytics.observe(current_order, delivery_id, dist, dist * LITERS_PER_KM)
+
+        if not tanda["pending_codes"]:
+            self._finalize_tanda(tanda_id, delivery_id)
+
+        self._maybe_snapshot()
+        return True
+
+    def _apply_delivered(self, order: Order, tanda: dict, delivery_id: str,
+                         delivered_at: float, dist: float):
+        order.status = "delivered"
+        order.delivered_at = delivered_at
+        order.delivered_by = delivery_id
+        tanda["last_point"] = (order.lat, order.lon)
 
-        dist = float(current_order.get("distance_km", 0.0))
         self.stats["total_dispatched_orders"] += 1
         self.stats["distance_by_delivery"][delivery_id] += dist
         self.stats["orders_by_delivery"][delivery_id] += 1
@@ -248,44 +422,269 @@ class DeliveryManager:
         self.stats["liters_by_delivery"].setdefault(delivery_id, 0.0)
         self.stats["liters_by_delivery"][delivery_id] += liters
 
-        self.completed_orders.append(current_order)
-        tanda["orders"].pop(0)
-
-        if not tanda["orders"]:
-            tanda["status"] = "completed"
-            self._finalize_tanda(tanda_id, delivery_id)
-
-        return True
+        self.completed_orders.append(order)
+        del tanda["pending_codes"][order.code]
+        del self.active_codes[order.code]
 
     # ------------------------
     # Finalizar tanda
     # ------------------------
     def _finalize_tanda(self, tanda_id: int, delivery_id: Optional[str] = None):
-        tanda = self.tandas.get(tanda_id)
-        if not tanda:
+        if tanda_id not in self.tandas:
             return
 
-        tanda["ended_at"] = time.time()
+        ended_at = self.clock()
+        self._apply_completed(tanda_id, delivery_id, ended_at)
+        self._log("completed", tanda=tanda_id, courier=delivery_id, at=ended_at)
+
+        self._try_assign_tandas()
+
+    def _apply_completed(self, tanda_id: int, delivery_id: Optional[str], ended_at: float):
+        tanda = self.tandas[tanda_id]
+        tanda["ended_at"] = ended_at
         tanda["status"] = "completed"
+        self._completed_tandas.append(tanda)
 
         if delivery_id and delivery_id in self.deliveries:
-            self.deliveries[delivery_id]["status"] = "available"
-            self.deliveries[delivery_id]["assigned_tanda"] = None
-
-        self._try_assign_tandas()
+            self._apply_available(delivery_id)
 
     # ------------------------
     # Consultas
     # ------------------------
     def get_pending_counts(self):
-        return {z: len(q) for z, q in self.zone_queues.items()}
+        return {z: len(q) for z, q in self.zone_queues.items() if len(q)}
 
     def get_tanda_info(self, tanda_id: int) -> Optional[dict]:
-        return self.tandas.get(tanda_id)
+        tanda = self.tandas.get(tanda_id)
+        if tanda is None and self.archive:
+            tanda = self.archive.get("tanda", tanda_id)
+        return tanda
+
+    # ------------------------
+    # Archivo (historial frío)
+    # ------------------------
+    def _archive_order(self, order: Order):
+        if self.archive:
+            self.archive.append("order", order.to_dict(), phone=order.user)
+
+    def _archive_tanda(self, tanda: dict):
+        # sale de la memoria caliente: deja de estar en self.tandas
+        self.tandas.pop(tanda["id"], None)
+        self._write_tanda(tanda)
+
+    def _write_tanda(self, tanda: dict):
+        if self.archive:
+            # los pedidos se archivan aparte: la tanda guarda solo sus ids
+            record = {**tanda, "orders": [o.id for o in tanda["orders"]]}
+            self.archive.append("tanda", record, ts=tanda.get("created_at"))
+
+    def flush_history(self):
+        """Copia al archivo todo el historial caliente (al apagar y en cada snapshot)."""
+        self.completed_orders.drain()
+        for tanda in self._completed_tandas:
+            self._write_tanda(tanda)
+
+    # ------------------------
+    # Journal, snapshots y recuperación
+    # ------------------------
+    def _log(self, event: str, **data):
+        """Anota una transición ya aplicada (el snapshot lo decide _maybe_snapshot)."""
+        if self.journal is None or self._replaying:
+            return
+        data["e"] = event
+        self.journal.append(data)
+        self._since_snapshot += 1
+
+    def _maybe_snapshot(self):
+        """
+        Al final de cada operación pública, nunca a mitad: cada
+        `snapshot_every` eventos toma snapshot de un estado consistente.
+        """
+        if self.journal is None or self._replaying or self._since_snapshot < self.snapshot_every:
+            return
+        self._capture_snapshot()
+        if not self.defer_snapshots:
+            self.write_snapshot()
+
+    def export_state(self) -> dict:
+        """
+        Estado en curso, serializable. No incluye lo ya terminado (eso va
+        al archivo), así que su tamaño depende de lo pendiente y no de
+        cuánto lleva andando el servicio.
+        """
+        return {
+            "next_tanda_id": self._next_tanda_id,
+            "max_order_id": self._max_order_id,
+            "stats": self.get_stats(),
+            "deliveries": {d: {**info, "stats": dict(info["stats"])}
+                           for d, info in self.deliveries.items()},
+            "idle": list(self.idle_couriers),
+            # FIFO de cada zona, en orden de llegada
+            "pending": {zone: [o.to_dict() for o in q.all()]
+                        for zone, q in self.zone_queues.items() if len(q)},
+            "tandas": [
+                {**t, "orders": [o.to_dict() for o in t["orders"]],
+                 "pending_codes": list(t["pending_codes"])}
+                for t in self.tandas.values() if "ended_at" not in t
+            ],
+            "pending_tandas": list(self.pending_tandas),
+        }
+
+    def load_state(self, state: dict):
+        self._next_tanda_id = state["next_tanda_id"]
+        self._max_order_id = state.get("max_order_id", 0)
+        self.stats = state["stats"]
+        self.deliveries = state["deliveries"]
+        for delivery_id in state["idle"]:
+            self.idle_couriers.release(delivery_id)
+
+        for orders in state["pending"].values():
+            for data in orders:
+                self._apply_enqueued(Order.from_dict(data))
+
+        for data in state["tandas"]:
+            tanda = {**data, "orders": [Order.from_dict(o) for o in data["orders"]],
+                     "pending_codes": dict.fromkeys(data["pending_codes"])}
+            if tanda.get("last_point"):
+                tanda["last_point"] = tuple(tanda["last_point"])
+            self.tandas[tanda["id"]] = tanda
+            for order in tanda["orders"]:
+                self._max_order_id = max(self._max_order_id, order.id)
+                if order.code in tanda["pending_codes"]:
+                    self.active_codes[order.code] = order
+
+        self.pending_tandas = deque(state["pending_tandas"])
+
+    def _replay(self, ev: dict):
+        """Aplica un evento del journal sin volver a decidir nada."""
+        kind = ev["e"]
+        if kind == "registered":
+            if ev["courier"] not in self.deliveries:
+                self._apply_registered(ev["courier"])
+        elif kind == "available":
+            self._apply_available(ev["courier"])
+        elif kind == "busy":
+            self._apply_busy(ev["courier"], ev["tanda"])
+        elif kind == "enqueued":
+            self._apply_enqueued(Order.from_dict(ev["order"]))
+        elif kind == "cancelled":
+            self._apply_cancelled(ev["id"], ev["zone"])
+        elif kind == "tanda":
+            q = self.zone_queues[ev["zone"]]
+            pairs = [(o, leg) for o, leg in ((q.cancel(i), leg) for i, leg in zip(ev["orders"], ev["legs"]))
+                     if o is not None]
+            self._apply_tanda(ev["id"], ev["zone"], [o for o, _ in pairs], [leg for _, leg in pairs],
+                              ev["route_km"], ev["at"])
+        elif kind == "assigned":
+            self._apply_assigned(ev["tanda"], ev["courier"], ev["at"])
+        elif kind == "delivered":
+            order = self.active_codes[ev["code"]]
+            self._apply_delivered(order, self.tandas[order.tanda_id], ev["courier"], ev["at"], ev["km"])
+        elif kind == "completed":
+            self._apply_completed(ev["tanda"], ev["courier"], ev["at"])
+
+    def _capture_snapshot(self):
+        """Parte en memoria: corta el journal y copia el estado en curso."""
+        self.flush_history()
+        seq = self.journal.rotate()
+        state = self.export_state()
+        self._since_snapshot = 0
+        with self._snapshot_lock:
+            # si había uno sin escribir, este lo reemplaza (cubre más eventos)
+            self._pending_snapshot = (seq, state)
+
+    def write_snapshot(self) -> bool:
+        """
+        Parte lenta (SQLite + JSON a disco) del último snapshot capturado.
+        No toca el estado en memoria: con defer_snapshots se llama desde un
+        thread del write-behind. Hasta que termina, el snapshot anterior y
+        sus segmentos siguen en disco, así que un crash no pierde nada.
+        """
+        with self._snapshot_write_lock:
+            with self._snapshot_lock:
+                pending, self._pending_snapshot = self._pending_snapshot, None
+            if pending is None:
+                return False
+            seq, state = pending
+            # lo terminado tiene que estar en el archivo antes de soltar el journal
+            if self.archive:
+                self.archive.flush()
+            self.journal.write_snapshot(state, seq)
+            return True
+
+    def snapshot(self):
+        """Corta el journal y guarda el estado en curso (escritura atómica)."""
+        if self.journal is None:
+            return
+        self._capture_snapshot()
+        self.write_snapshot()
+
+    def restore(self) -> int:
+        """
+        Último snapshot + tail del journal. Devuelve cuántos eventos se
+        reprodujeron. Llamar con el scheduler ya conectado.
+        """
+        if self.journal is None:
+            return 0
+        state, events = self.journal.load()
+        replayed = 0
+        self._replaying = True
+        try:
+            if state:
+                self.load_state(state)
+            for ev in events:
+                self._replay(ev)
+                replayed += 1
+        finally:
+            self._replaying = False
+
+        # crash entre la última entrega de una tanda y su "completed"
+        for tanda_id, tanda in list(self.tandas.items()):
+            if not tanda["pending_codes"] and "ended_at" not in tanda:
+                self._finalize_tanda(tanda_id, tanda["assigned_to"])
+
+        for zone in self.zone_queues:
+            self._reschedule_zone(zone)
+        self._try_assign_tandas()
+        self._maybe_snapshot()
+        return replayed
+
+    def close(self):
+        """Al apagar: modelo de ETA, historial y snapshot final."""
+        self.eta.save()
+        if self.journal is not None:
+            self.snapshot()
+            self.journal.close()
+        else:
+            self.flush_history()
 
     def get_stats(self):
-        return self.stats
+        """Copia de los totales históricos (no se puede modificar el estado desde afuera)."""
+        return {
+            k: dict(v) if isinstance(v, dict) else v
+            for k, v in self.stats.items()
+        }
+
+    def get_live_stats(self) -> dict:
+        """Ventanas de 15 min / 1 h / 24 h + carga actual por zona."""
+        return {
+            "windows": self.analytics.snapshot(),
+            "pending_by_zone": self.get_pending_counts(),
+            "pending_tandas": len(self.pending_tandas),
+            "idle_couriers": len(self.idle_couriers),
+        }
 
 
 # instancia global
-DELIVERY_MANAGER = DeliveryManager()
+DELIVERY_MANAGER = DeliveryManager(
+    zone_index=load_zone_index(ZONES_CONFIG_PATH, RESTAURANT_COORDS),
+    eta=EtaEstimator(prior_eta_min, path=ETA_MODEL_PATH),
+    archive=ORDER_ARCHIVE,
+    journal=DispatchJournal(DISPATCH_JOURNAL_DIR) if DISPATCH_JOURNAL_DIR else None,
+    # el snapshot lo escribe el write-behind (main.py / delivery_ipc.py)
+    defer_snapshots=True,
+)
+DELIVERY_MANAGER.eta.load()
+TANDA_SCHEDULER = TandaScheduler(DELIVERY_MANAGER)
+DELIVERY_MANAGER.scheduler = TANDA_SCHEDULER
+DELIVERY_MANAGER.restore()
@@ -0,0 +1,184 @@
+# algorithms/eta_estimator.py
+import json
+import os
+import time
+from typing import Callable, Dict, Optional, Tuple
+
+from structures.streaming_stats import EWMA, QuantileSketch
+
+MIN_SAMPLES = 20        # antes de esto se usa la fórmula fija
+MIN_DISTANCE_KM = 0.5   # evita dividir por distancias ~0 al medir min/km
+
+
+class _Series:
+    """EWMA + sketch de cuantiles de una misma magnitud."""
+    __slots__ = ("ewma", "sketch")
+
+    def __init__(self, ewma: Optional[EWMA] = None, sketch: Optional[QuantileSketch] = None):
+        self.ewma = ewma or EWMA(alpha=0.05)
+        self.sketch = sketch or QuantileSketch(min_value=0.05, max_value=600.0)
+
+    def add(self, x: float):
+        self.ewma.update(x)
+        self.sketch.add(x)
+
+    @property
+    def count(self) -> int:
+        return self.ewma.count
+
+    def p(self, q: float) -> Optional[float]:
+        return self.sketch.quantile(q)
+
+    def to_dict(self):
+        return {"ewma": self.ewma.to_dict(), "sketch": self.sketch.to_dict()}
+
+    @classmethod
+    def from_dict(cls, d):
+        return cls(EWMA.from_dict(d["ewma"]), QuantileSketch.from_dict(d["sketch"]))
+
+
+class EtaEstimator:
+    """
+    ETA aprendida de las entregas reales, en dos tramos:
+
+      espera (min)  = assigned_at - enqueued_at   -> por zona
+      viaje (min/km) = (delivered_at - assigned_at) / distance_km -> por hora del día
+
+    Cada entrega actualiza en O(1) agregados por zona, por hora y globales
+    (EWMA + sketch de cuantiles). estimate() devuelve p50/p90 usando el
+    agregado más específico con suficientes muestras; sin datos aplica la
+    fórmula fija de antes (prior).
+
+    observe() nunca toca disco: solo marca el modelo como modificado. El
+    write-behind toma una copia con export_if_dirty() y la escribe con
+    write() desde un thread.
+    """
+
+    def __init__(self, prior: Callable[[float, int], float],
+                 clock: Callable[[], float] = time.time,
+                 path: Optional[str] = None):
+        self.prior = prior
+        self.clock = clock
+        self.path = path
+        self.dirty = False
+
+        self.wait_by_zone: Dict[str, _Series] = {}
+        self.wait_all = _Series()
+        self.ride_by_hour: Dict[int, _Series] = {}
+        self.ride_all = _Series()
+
+    # ------------------------
+    # Aprendizaje
+    # ------------------------
+    @staticmethod
+    def _hour(ts: float) -> int:
+        return time.localtime(ts).tm_hour
+
+    def observe(self, order):
+        enq = order.enqueued_at
+        asg = order.assigned_at
+        dlv = order.delivered_at
+        if enq is None or asg is None or dlv is None:
+            return
+
+        wait_min = max(0.0, (asg - enq) / 60)
+        ride_min_per_km = max(0.0, (dlv - asg) / 60) / max(order.distance_km or 0.0, MIN_DISTANCE_KM)
+
+        zone = order.zone
+        if zone is not None:
+            self.wait_by_zone.setdefault(zone, _Series()).add(wait_min)
+        self.wait_all.add(wait_min)
+
+        self.ride_by_hour.setdefault(self._hour(enq), _Series()).add(ride_min_per_km)
+        self.ride_all.add(ride_min_per_km)
+
+        self.dirty = True
+
+    # ------------------------
+    # Estimación
+    # ------------------------
+    @staticmethod
+    def _pick(*series: Optional[_Series]) -> Optional[_Series]:
+        for s in series:
+            if s is not None and s.count >= MIN_SAMPLES:
+                return s
+        return None
+
+    def estimate(self, zone: str, distance_km: float, queue_len: int,
+                 now: Optional[float] = None) -> Tuple[int, int]:
+        """(p50, p90) en minutos."""
+        now = self.clock() if now is None else now
+        wait = self._pick(self.wait_by_zone.get(zone), self.wait_all)
+        ride = self._pick(self.ride_by_hour.get(self._hour(now)), self.ride_all)
+
+        if wait is None or ride is None:
+            base = self.prior(distance_km, queue_len)
+            return int(base), int(base * 1.5)
+
+        dist = max(distance_km, MIN_DISTANCE_KM)
+        p50 = wait.p(0.5) + dist * ride.p(0.5)
+        p90 = wait.p(0.9) + dist * ride.p(0.9)
+        return int(round(p50)), int(round(max(p90, p50)))
+
+    # ------------------------
+    # Persistencia
+    # ------------------------
+    def to_dict(self) -> dict:
+        return {
+            "wait_by_zone": {z: s.to_dict() for z, s in self.wait_by_zone.items()},
+            "wait_all": self.wait_all.to_dict(),
+            "ride_by_hour": {str(h): s.to_dict() for h, s in self.ride_by_hour.items()},
+            "ride_all": self.ride_all.to_dict(),
+        }
+
+    def load_dict(self, d: dict):
+        self.wait_by_zone = {z: _Series.from_dict(s) for z, s in d.get("wait_by_zone", {}).items()}
+        self.ride_by_hour = {int(h): _Series.from_dict(s) for h, s in d.get("ride_by_hour", {}).items()}
+        if "wait_all" in d:
+            self.wait_all = _Series.from_dict(d["wait_all"])
+        if "ride_all" in d:
+            self.ride_all = _Series.from_dict(d["ride_all"])
+
+    def export_if_dirty(self) -> Optional[dict]:
+        """Copia del modelo si cambió desde la última (en el mismo thread que observe)."""
+        if not self.path or not self.dirty:
+            return None
+        self.dirty = False
+        return self.to_dict()
+
+    def write(self, data: dict, path: Optional[str] = None):
+        """Escritura atómica (tmp + rename) para no dejar un modelo a medias."""
+        path = path or self.path
+        if not path:
+            return
+        tmp = f"{path}.tmp"
+        try:
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(data, f)
+            os.replace(tmp, path)
+        except OSError as e:
+            print("⚠️ No se pudo guardar el modelo de ETA:", e)
+
+    def save(self, path: Optional[str] = None):
+        self.dirty = False
+        self.write(self.to_dict(), path)
+
+    def load(self, path: Optional[str] = None) -> bool:
+        path = path or self.path
+        if not path or not os.path.exists(path):
+            return False
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                self.load_dict(json.load(f))
+            return True
+        except (OSError, ValueError, KeyError) as e:
+            print("⚠️ Modelo de ETA inválido, se arranca de cero:", e)
+            return False
+
+    def stats(self) -> dict:
+        return {
+            "samples": self.wait_all.count,
+            "wait_p50_min": self.wait_all.p(0.5),
+            "ride_p50_min_per_km": self.ride_all.p(0.5),
+            "zones": len(self.wait_by_zone),
+        }
@@ -0,0 +1,54 @@
+# algorithms/menu_cache.py
+from collections import OrderedDict
+from typing import Any, Callable, Hashable
+
+
+class MenuPageCache:
+    """
+    Cache LRU de páginas del menú ya renderizadas (secciones de la lista).
+
+    Clave: (categoría, orden, página). Cada entrada vale solo para la
+    versión de catálogo con la que se generó: si cambia la versión, la
+    cache se vacía entera.
+
+    Las secciones cacheadas se comparten entre usuarios: NO mutarlas.
+    """
+
+    def __init__(self, maxsize: int = 256):
+        self.maxsize = maxsize
+        self.version = None
+        self._data: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_build(self, version, key: Hashable, build_fn: Callable[[], Any]):
+        if version != self.version:
+            self._data.clear()
+            self.version = version
+
+        value = self._data.get(key)
+        if value is not None:
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+        self.misses += 1
+        value = build_fn()
+        self._data[key] = value
+        if len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+        return value
+
+    def clear(self):
+        self._data.clear()
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "version": self.version,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else None,
+        }
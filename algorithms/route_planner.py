@@ -0,0 +1,107 @@
+# algorithms/route_planner.py
+import time
+from typing import List, Sequence, Tuple
+
+from structures.data_models import Order
+from utils.geo_calculator import distance_matrix
+
+# tope de cómputo para que pueda correr en línea al armar la tanda
+DEFAULT_TIME_BUDGET_S = 0.004
+
+
+class RoutePlan:
+    """Resultado del planificador: paradas en orden + km de cada tramo."""
+    __slots__ = ("orders", "legs_km", "total_km")
+
+    def __init__(self, orders: List[Order], legs_km: List[float]):
+        self.orders = orders
+        self.legs_km = legs_km
+        self.total_km = sum(legs_km)
+
+
+def _path_cost(route: Sequence[int], d: List[List[float]]) -> float:
+    return sum(d[route[i]][route[i + 1]] for i in range(len(route) - 1))
+
+
+def _nearest_neighbour(n: int, d: List[List[float]]) -> List[int]:
+    """Ruta abierta desde el nodo 0 (restaurante) yendo siempre al más cercano."""
+    route = [0]
+    left = set(range(1, n))
+    while left:
+        last = d[route[-1]]
+        nxt = min(left, key=last.__getitem__)
+        route.append(nxt)
+        left.remove(nxt)
+    return route
+
+
+def _two_opt(route: List[int], d: List[List[float]], deadline: float) -> bool:
+    """Una pasada de 2-opt (ruta abierta, el 0 queda fijo). True si mejoró."""
+    n = len(route)
+    improved = False
+    for i in range(1, n - 1):
+        a, b = route[i - 1], route[i]
+        for j in range(i + 1, n):
+            c = route[j]
+            nxt = route[j + 1] if j + 1 < n else None
+            before = d[a][b] + (d[c][nxt] if nxt is not None else 0.0)
+            after = d[a][c] + (d[b][nxt] if nxt is not None else 0.0)
+            if after < before - 1e-9:
+                route[i:j + 1] = reversed(route[i:j + 1])
+                improved = True
+                b = route[i]
+        if time.perf_counter() > deadline:
+            break
+    return improved
+
+
+def _or_opt(route: List[int], d: List[List[float]], deadline: float) -> bool:
+    """Mueve tramos de 1 a 3 paradas a otra posición si acorta. True si mejoró."""
+    improved = False
+    for seg_len in (1, 2, 3):
+        i = 1
+        while i + seg_len <= len(route):
+            seg = route[i:i + seg_len]
+            rest = route[:i] + route[i + seg_len:]
+            base = _path_cost(route, d)
+            best_cost, best_pos = base, None
+            for pos in range(1, len(rest) + 1):
+                if pos == i:
+                    continue
+                cand = rest[:pos] + seg + rest[pos:]
+                cost = _path_cost(cand, d)
+                if cost < best_cost - 1e-9:
+                    best_cost, best_pos = cost, pos
+            if best_pos is not None:
+                route[:] = rest[:best_pos] + seg + rest[best_pos:]
+                improved = True
+            i += 1
+            if time.perf_counter() > deadline:
+                return improved
+    return improved
+
+
+def plan_route(origin: Tuple[float, float], stops: List[Order], mode: str = "haversine",
+               time_budget_s: float = DEFAULT_TIME_BUDGET_S) -> RoutePlan:
+    """
+    Ordena las paradas (pedidos con lat/lon) de una tanda saliendo de `origin`:
+    vecino más cercano + 2-opt / Or-opt hasta que no mejore o se agote
+    `time_budget_s`. La matriz de distancias se calcula una sola vez.
+    """
+    if not stops:
+        return RoutePlan([], [])
+
+    lats = [origin[0]] + [o.lat for o in stops]
+    lons = [origin[1]] + [o.lon for o in stops]
+    d = distance_matrix(lats, lons, mode).tolist()
+
+    deadline = time.perf_counter() + time_budget_s
+    route = _nearest_neighbour(len(lats), d)
+    while time.perf_counter() < deadline:
+        changed = _two_opt(route, d, deadline)
+        changed = _or_opt(route, d, deadline) or changed
+        if not changed:
+            break
+
+    legs = [d[route[k - 1]][route[k]] for k in range(1, len(route))]
+    return RoutePlan([stops[k - 1] for k in route[1:]], legs)
@@ -0,0 +1,106 @@
+# algorithms/tanda_scheduler.py
+import asyncio
+import heapq
+from typing import Callable, Dict, List, Optional, Tuple
+
+
+class TandaScheduler:
+    """
+    Dispara la regla de los 45 minutos por TIEMPO, no por llegada de pedidos.
+
+    Mantiene un min-heap de (deadline, zona): la deadline de una zona es el
+    momento en que su pedido más viejo cumple TANDA_MAX_WAIT_SECONDS. Al
+    vencer, se arma la tanda de esa zona y se intenta asignar.
+
+    - schedule / cancel / cada disparo: O(log n)
+    - reprogramar una zona deja la entrada vieja en el heap y se descarta
+      al salir (borrado perezoso)
+    - `clock` inyectable (por defecto el del manager): en tests se usa un
+      reloj virtual y `run_due(now)`
+    """
+
+    def __init__(self, manager, clock: Optional[Callable[[], float]] = None):
+        self.manager = manager
+        self.clock = clock or manager.clock
+        self._heap: List[Tuple[float, int, str]] = []
+        self._deadlines: Dict[str, float] = {}
+        self._seq = 0
+        self._wakeup: Optional[asyncio.Event] = None
+        self.fired = 0
+
+    # ------------------------
+    # Programación
+    # ------------------------
+    def schedule(self, zone: str, deadline: float):
+        if self._deadlines.get(zone) == deadline:
+            return
+        self._deadlines[zone] = deadline
+        self._seq += 1
+        heapq.heappush(self._heap, (deadline, self._seq, zone))
+
+        # si es la nueva deadline más próxima, despertar al loop
+        if self._wakeup is not None and self._heap[0][2] == zone:
+            self._wakeup.set()
+
+    def cancel(self, zone: str):
+        self._deadlines.pop(zone, None)
+
+    def next_deadline(self) -> Optional[float]:
+        self._drop_stale()
+        return self._heap[0][0] if self._heap else None
+
+    def _drop_stale(self):
+        while self._heap:
+            deadline, _, zone = self._heap[0]
+            if self._deadlines.get(zone) == deadline:
+                return
+            heapq.heappop(self._heap)
+
+    # ------------------------
+    # Disparo
+    # ------------------------
+    def run_due(self, now: Optional[float] = None) -> int:
+        """Procesa todas las zonas vencidas a `now`. Devuelve cuántas."""
+        now = self.clock() if now is None else now
+
+        due = []
+        while True:
+            self._drop_stale()
+            if not self._heap or self._heap[0][0] > now:
+                break
+            _, _, zone = heapq.heappop(self._heap)
+            del self._deadlines[zone]
+            due.append(zone)
+
+        # el manager vuelve a programar cada zona si le quedan pedidos
+        for zone in due:
+            self.manager.on_zone_deadline(zone, now)
+
+        fired = len(due)
+        if fired:
+            self.fired += fired
+            self.manager._try_assign_tandas()
+        return fired
+
+    async def run(self, max_sleep: float = 60.0):
+        """Loop para correr como task dentro de la app."""
+        self._wakeup = asyncio.Event()
+        try:
+            while True:
+                self.run_due()
+                deadline = self.next_deadline()
+                delay = max_sleep if deadline is None else min(max_sleep, max(0.0, deadline - self.clock()))
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=delay)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            self._wakeup = None
+
+    def stats(self) -> dict:
+        return {
+            "scheduled_zones": len(self._deadlines),
+            "next_deadline": self.next_deadline(),
+            "fired": self.fired,
+        }
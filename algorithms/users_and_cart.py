@@ -1,20 +1,33 @@
 # algorithms/users_and_cart.py
 
+import asyncio
+import os
 import time
-from typing import Dict, List, Optional
+from collections import OrderedDict
+from typing import Callable, List, Optional
+
+# sesiones inactivas más de esto se liberan de memoria (la persistencia,
+# si hay SessionStore, las recupera en el próximo mensaje)
+SESSION_TTL_SECONDS = float(os.getenv("SESSION_TTL_SECONDS", 6 * 3600))
+SESSIONS_MAX = int(os.getenv("SESSIONS_MAX", 200_000))
 
 # ============================================================
 #                    MODELO DE USUARIO
 # ============================================================
 
 class User:
-    def __init__(self, phone: str):
+    # __slots__: sin __dict__ por instancia (ver benchmarks/bench_sessions.py)
+    __slots__ = ("phone", "created_at", "last_seen", "name", "state",
+                 "category", "sort", "page",
+                 "pending_product_id", "pending_qty", "cart")
+
+    def __init__(self, phone: str, now: Optional[float] = None):
 
-        # Número de WhatsApp — COMPATIBILIDAD TOTAL
+        # Número de WhatsApp (`number` es un alias de solo lectura)
         self.phone = phone
-        self.number = phone   # ← FIX CRÍTICO (lo pide main.py y cart_management.py)
 
-        self.created_at = time.time()
+        self.created_at = time.time() if now is None else now
+        self.last_seen = self.created_at
 
         # Datos básicos
         self.name = None
@@ -22,11 +35,11 @@ class User:
         # Estado conversacional
         self.state = "idle"
 
-        # Catálogo
+        # Catálogo: cursor liviano (categoría, orden, página) sobre las
+        # vistas compartidas del catálogo; nada de copias por usuario
         self.category = "Todos"
         self.sort = None
         self.page = 0
-        self._filtered = []
 
         # Flujo de compra temporal
         self.pending_product_id: Optional[str] = None
@@ -35,26 +48,126 @@ class User:
         # Carrito real (solo líneas, CartManager controla totales)
         self.cart: List[dict] = []
 
+    @property
+    def number(self) -> str:
+        """Compatibilidad: cart_management.py usa user.number."""
+        return self.phone
+
     def reset_flow(self):
         """Reinicia el flujo del usuario."""
         self.state = "idle"
         self.pending_product_id = None
         self.pending_qty = None
 
+    # campos que sobreviven a un reinicio
+    PERSISTED = ("name", "state", "category", "sort", "page",
+                 "pending_product_id", "pending_qty", "created_at")
+
+    def to_dict(self) -> dict:
+        data = {f: getattr(self, f) for f in self.PERSISTED}
+        data["cart"] = [dict(line) for line in self.cart]
+        return data
+
+    @classmethod
+    def from_dict(cls, phone: str, data: dict) -> "User":
+        user = cls(phone)
+        for f in cls.PERSISTED:
+            if f in data:
+                setattr(user, f, data[f])
+        user.cart = list(data.get("cart", []))
+        return user
+
 
 # ============================================================
 #                       USER MANAGER
 # ============================================================
 
 class UserManager:
-    def __init__(self):
-        self.users: Dict[str, User] = {}
+    """
+    Sesiones en memoria, ordenadas por último uso (LRU).
+
+    Se desalojan las que pasan `ttl_seconds` sin actividad y las más viejas
+    si se supera `max_users`: en cada get() se mira solo el frente del
+    OrderedDict, así que desalojar es O(1) amortizado. Si una sesión
+    desalojada tiene carrito, se pasa antes a `on_evict` (ej: guardarla).
+    """
+
+    def __init__(self, store=None, ttl_seconds: Optional[float] = SESSION_TTL_SECONDS,
+                 max_users: Optional[int] = SESSIONS_MAX,
+                 on_evict: Optional[Callable[[User], None]] = None,
+                 clock: Callable[[], float] = time.time):
+        self.users: "OrderedDict[str, User]" = OrderedDict()
+        # SessionStore opcional (persistencia write-behind)
+        self.store = store
+        self.ttl_seconds = ttl_seconds
+        self.max_users = max_users
+        self.on_evict = on_evict
+        self.clock = clock
+        self.evicted = 0
+        self.spilled = 0
 
     def get(self, phone: str) -> User:
         """Obtiene o crea un usuario por su número."""
-        if phone not in self.users:
-            self.users[phone] = User(phone)
-        return self.users[phone]
+        now = self.clock()
+        user = self.users.get(phone)
+        if user is None:
+            user = self._insert(phone, User(phone, now), now)
+        else:
+            self.users.move_to_end(phone)
+            user.last_seen = now
+        return user
+
+    def _insert(self, phone: str, user: User, now: float) -> User:
+        user.last_seen = now
+        self.users[phone] = user
+        self.evict_idle(now)
+        return user
+
+    def evict_idle(self, now: Optional[float] = None) -> int:
+        """Desaloja vencidos por TTL y excedentes del tope; devuelve cuántos."""
+        now = self.clock() if now is None else now
+        users = self.users
+        evicted = 0
+        while users:
+            phone, user = next(iter(users.items()))
+            over_cap = self.max_users is not None and len(users) > self.max_users
+            expired = self.ttl_seconds is not None and now - user.last_seen > self.ttl_seconds
+            if not (over_cap or expired):
+                break
+            del users[phone]
+            evicted += 1
+            if user.cart and self.on_evict is not None:
+                self.on_evict(user)
+                self.spilled += 1
+        self.evicted += evicted
+        return evicted
+
+    def stats(self) -> dict:
+        return {"sessions": len(self.users), "max": self.max_users,
+                "ttl_seconds": self.ttl_seconds, "evicted": self.evicted,
+                "spilled": self.spilled}
+
+    async def hydrate(self, phone: str) -> User:
+        """
+        Trae la sesión guardada la primera vez que se toca al usuario.
+        La lectura de disco corre en un thread, fuera del event loop.
+        """
+        user = self.users.get(phone)
+        if user is not None or self.store is None:
+            return self.get(phone)
+        data = await asyncio.to_thread(self.store.load, phone)
+        user = self.users.get(phone)  # alguien pudo crearlo mientras tanto
+        if user is None:
+            now = self.clock()
+            user = User.from_dict(phone, data) if data else User(phone, now)
+            self._insert(phone, user, now)
+        return user
+
+    def mark_dirty(self, phone: str):
+        """Agenda guardar al usuario en el próximo flush (no toca disco)."""
+        user = self.users.get(phone)
+        if user is not None and self.store is not None:
+            self.store.mark_dirty(phone, user.to_dict())
 
     def set_state(self, phone: str, state: str):
         self.get(phone).state = state
@@ -67,7 +180,6 @@ class UserManager:
         u.page = 0
         u.category = "Todos"
         u.sort = None
-        u._filtered = []
 
     def set_pending_product(self, phone: str, prod_id: str):
         u = self.get(phone)
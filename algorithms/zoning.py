@@ -0,0 +1,197 @@
+# algorithms/zoning.py
+import json
+import os
+from abc import ABC, abstractmethod
+from math import cos, floor, radians
+from typing import Dict, List, Optional, Sequence, Tuple
+
+KM_PER_DEG_LAT = 110.574
+KM_PER_DEG_LON_EQUATOR = 111.320
+
+_GEOHASH_ALPHABET = "0123456789bcdefghjkmnpqrstuvwxyz"
+
+
+# ------------------------
+# Índices de zona
+# ------------------------
+class ZoneIndex(ABC):
+    """Interfaz: punto (lat, lon) -> nombre de zona."""
+
+    @abstractmethod
+    def zone_for(self, lat: float, lon: float) -> str:
+        ...
+
+
+class QuadrantZoneIndex(ZoneIndex):
+    """El esquema original: NE/NO/SE/SO alrededor de un centro."""
+
+    def __init__(self, center: Tuple[float, float]):
+        self.center = center
+
+    def zone_for(self, lat, lon):
+        lat_c, lon_c = self.center
+        if lat >= lat_c and lon >= lon_c:
+            return "NE"
+        if lat >= lat_c and lon < lon_c:
+            return "NO"
+        if lat < lat_c and lon >= lon_c:
+            return "SE"
+        return "SO"
+
+
+class GridZoneIndex(ZoneIndex):
+    """
+    Grilla uniforme de celdas de `cell_km` de lado con origen en `origin`.
+    Zona = "G<fila>_<col>" (pueden ser negativas). Lookup O(1): dos floor.
+    """
+
+    def __init__(self, origin: Tuple[float, float], cell_km: float = 1.5):
+        self.origin = origin
+        self.cell_km = cell_km
+        self._deg_lat = cell_km / KM_PER_DEG_LAT
+        self._deg_lon = cell_km / (KM_PER_DEG_LON_EQUATOR * cos(radians(origin[0])))
+
+    def cell(self, lat, lon) -> Tuple[int, int]:
+        return (
+            floor((lat - self.origin[0]) / self._deg_lat),
+            floor((lon - self.origin[1]) / self._deg_lon),
+        )
+
+    def zone_for(self, lat, lon):
+        row, col = self.cell(lat, lon)
+        return f"G{row}_{col}"
+
+
+class GeohashZoneIndex(ZoneIndex):
+    """Zona = geohash del punto con `precision` caracteres (5 ≈ 4.9 x 4.9 km, 6 ≈ 1.2 x 0.6 km)."""
+
+    def __init__(self, precision: int = 6):
+        self.precision = precision
+
+    def zone_for(self, lat, lon):
+        return geohash_encode(lat, lon, self.precision)
+
+
+class PolygonZoneIndex(ZoneIndex):
+    """
+    Zonas a mano (polígonos) por encima de otro índice.
+
+    Para que el lookup siga siendo O(1) en promedio, cada polígono se
+    registra en las celdas de una grilla auxiliar que toca su bbox; un
+    punto solo se prueba contra los polígonos de su celda. Si no cae en
+    ninguno, decide `fallback`.
+    """
+
+    def __init__(self, polygons: Dict[str, Sequence[Tuple[float, float]]],
+                 fallback: ZoneIndex, bucket: GridZoneIndex):
+        self.polygons = {name: [tuple(p) for p in pts] for name, pts in polygons.items()}
+        self.fallback = fallback
+        self.bucket = bucket
+        self._cells: Dict[Tuple[int, int], List[str]] = {}
+
+        for name, pts in self.polygons.items():
+            lats = [p[0] for p in pts]
+            lons = [p[1] for p in pts]
+            r0, c0 = bucket.cell(min(lats), min(lons))
+            r1, c1 = bucket.cell(max(lats), max(lons))
+            for r in range(r0, r1 + 1):
+                for c in range(c0, c1 + 1):
+                    self._cells.setdefault((r, c), []).append(name)
+
+    def zone_for(self, lat, lon):
+        for name in self._cells.get(self.bucket.cell(lat, lon), ()):
+            if point_in_polygon(lat, lon, self.polygons[name]):
+                return name
+        return self.fallback.zone_for(lat, lon)
+
+
+# ------------------------
+# Helpers geométricos
+# ------------------------
+def point_in_polygon(lat: float, lon: float, pts: Sequence[Tuple[float, float]]) -> bool:
+    """Ray casting sobre (lat, lon) tratados como plano (alcanza a escala ciudad)."""
+    inside = False
+    n = len(pts)
+    j = n - 1
+    for i in range(n):
+        yi, xi = pts[i]
+        yj, xj = pts[j]
+        if (yi > lat) != (yj > lat):
+            x_cross = xi + (lat - yi) * (xj - xi) / (yj - yi)
+            if lon < x_cross:
+                inside = not inside
+        j = i
+    return inside
+
+
+def geohash_encode(lat: float, lon: float, precision: int = 6) -> str:
+    lat_lo, lat_hi = -90.0, 90.0
+    lon_lo, lon_hi = -180.0, 180.0
+    out = []
+    bits = 0
+    ch = 0
+    even = True
+    while len(out) < precision:
+        if even:
+            mid = (lon_lo + lon_hi) / 2
+            if lon >= mid:
+                ch = (ch << 1) | 1
+                lon_lo = mid
+            else:
+                ch <<= 1
+                lon_hi = mid
+        else:
+            mid = (lat_lo + lat_hi) / 2
+            if lat >= mid:
+                ch = (ch << 1) | 1
+                lat_lo = mid
+            else:
+                ch <<= 1
+                lat_hi = mid
+        even = not even
+        bits += 1
+        if bits == 5:
+            out.append(_GEOHASH_ALPHABET[ch])
+            bits = 0
+            ch = 0
+    return "".join(out)
+
+
+# ------------------------
+# Config
+# ------------------------
+def build_zone_index(config: dict, center: Tuple[float, float]) -> ZoneIndex:
+    """
+    config (data/zones.json):
+      {"type": "grid", "cell_km": 1.5, "origin": [lat, lon],
+       "polygons": {"Centro": [[lat, lon], ...]}}
+    type: "grid" | "geohash" (con "precision") | "quadrants"
+    """
+    kind = config.get("type", "grid")
+    origin = tuple(config.get("origin") or center)
+
+    if kind == "grid":
+        base: ZoneIndex = GridZoneIndex(origin, float(config.get("cell_km", 1.5)))
+    elif kind == "geohash":
+        base = GeohashZoneIndex(int(config.get("precision", 6)))
+    elif kind == "quadrants":
+        base = QuadrantZoneIndex(origin)
+    else:
+        raise ValueError(f"Tipo de zonificación desconocido: {kind}")
+
+    polygons = config.get("polygons") or {}
+    if polygons:
+        bucket = GridZoneIndex(origin, float(config.get("polygon_bucket_km", 1.0)))
+        return PolygonZoneIndex(polygons, base, bucket)
+    return base
+
+
+def load_zone_index(path: Optional[str], center: Tuple[float, float]) -> ZoneIndex:
+    """Carga la zonificación; sin archivo (o inválido) vuelve a los 4 cuadrantes."""
+    if path and os.path.exists(path):
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                return build_zone_index(json.load(f), center)
+        except (OSError, ValueError, TypeError) as e:
+            print("⚠️ Zonas inválidas, uso cuadrantes:", e)
+    return QuadrantZoneIndex(center)
@@ -0,0 +1,48 @@
+# benchmarks/bench_geo.py
+"""
+haversine escalar (loop Python) vs. versión vectorizada de
+utils/geo_calculator, uno-a-muchos, para 10k–1M puntos.
+
+    python -m benchmarks.bench_geo
+"""
+import time
+
+import numpy as np
+
+from utils.geo_calculator import haversine_km, distances_from
+
+CENTER = (-31.383640, -57.960620)
+SIZES = (10_000, 100_000, 1_000_000)
+
+
+def _best(fn, repeat=3):
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def main():
+    rng = np.random.default_rng(0)
+    print(f"{'puntos':>9} | {'escalar ms':>10} | {'haversine ms':>12} | {'equirect ms':>11} | {'error equirect':>14}")
+    for n in SIZES:
+        lats = CENTER[0] + rng.uniform(-0.1, 0.1, n)
+        lons = CENTER[1] + rng.uniform(-0.1, 0.1, n)
+        lat_list, lon_list = lats.tolist(), lons.tolist()
+
+        t_scalar = _best(lambda: [haversine_km(CENTER[0], CENTER[1], a, b)
+                                  for a, b in zip(lat_list, lon_list)], repeat=1)
+        t_hav = _best(lambda: distances_from(CENTER[0], CENTER[1], lats, lons))
+        t_eq = _best(lambda: distances_from(CENTER[0], CENTER[1], lats, lons, mode="equirect"))
+
+        exact = distances_from(CENTER[0], CENTER[1], lats, lons)
+        approx = distances_from(CENTER[0], CENTER[1], lats, lons, mode="equirect")
+        rel_err = float(np.max(np.abs(approx - exact) / np.maximum(exact, 1e-9)))
+
+        print(f"{n:>9} | {t_scalar * 1e3:>10.1f} | {t_hav * 1e3:>12.2f} | {t_eq * 1e3:>11.2f} | {rel_err:>14.2e}")
+
+
+if __name__ == "__main__":
+    main()
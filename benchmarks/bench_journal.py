@@ -0,0 +1,177 @@
+# benchmarks/bench_journal.py
+"""
+Recuperación del DeliveryManager después de un día de pedidos: replay del
+journal completo (sin snapshots) vs. último snapshot + tail. Verifica
+además que el estado recuperado sea igual al que había antes de apagar,
+que un crash justo después de la última entrega de una tanda (con
+snapshot en ese evento, o sin llegar a anotar el "completed") recupere
+al delivery libre, y que tras un crash (sin vaciar los pedidos al
+archivo) no se repitan ids de pedidos.
+
+    python -m benchmarks.bench_journal
+"""
+import os
+import random
+import tempfile
+import time
+
+# que los singletons del import no toquen data/
+_TMP = tempfile.mkdtemp(prefix="bench_journal_")
+os.environ.setdefault("ORDER_ARCHIVE_PATH", os.path.join(_TMP, "globals.sqlite3"))
+os.environ["DISPATCH_JOURNAL_DIR"] = ""
+
+from algorithms.delivery_manager import DeliveryManager, RESTAURANT_COORDS  # noqa: E402
+from algorithms.tanda_scheduler import TandaScheduler  # noqa: E402
+from algorithms.users_and_cart import User  # noqa: E402
+from structures.data_models import Order  # noqa: E402
+from utils.cart_management import CartManager  # noqa: E402
+from utils.dispatch_journal import DispatchJournal  # noqa: E402
+from utils.order_archive import OrderArchive  # noqa: E402
+
+ORDERS = 5_000        # un día con mucho movimiento
+COURIERS = 12
+DAY_SECONDS = 14 * 3600
+
+
+class VirtualClock:
+    def __init__(self):
+        self.now = 1_700_000_000.0
+
+    def __call__(self):
+        return self.now
+
+
+def _manager(name, snapshot_every, clock):
+    archive = OrderArchive(os.path.join(_TMP, f"{name}.sqlite3"))
+    journal = DispatchJournal(os.path.join(_TMP, name))
+    dm = DeliveryManager(clock=clock, archive=archive, journal=journal, snapshot_every=snapshot_every)
+    dm.scheduler = TandaScheduler(dm)
+    return dm
+
+
+def simulate_day(dm, clock, seed=0):
+    rng = random.Random(seed)
+    for i in range(COURIERS):
+        dm.register_delivery(f"delivery_{i}")
+
+    step = DAY_SECONDS / ORDERS
+    for i in range(1, ORDERS + 1):
+        clock.now += step
+        lat = RESTAURANT_COORDS[0] + rng.uniform(-0.03, 0.03)
+        lon = RESTAURANT_COORDS[1] + rng.uniform(-0.03, 0.03)
+        dm.enqueue_order(Order(id=i, user=f"5989{i:08d}", code="", total=500.0,
+                               lat=lat, lon=lon, created_at=clock.now))
+        dm.scheduler.run_due()
+
+        # cada delivery ocupado entrega su próxima parada con cierta probabilidad;
+        # al final del día quedan tandas a medio entregar y pedidos en cola
+        if i < ORDERS - 50:
+            for delivery_id, info in dm.deliveries.items():
+                tanda = dm.tandas.get(info["assigned_tanda"])
+                if tanda and tanda["pending_codes"] and rng.random() < 0.6:
+                    code = next(iter(tanda["pending_codes"]))
+                    dm.verify_and_mark_delivered(delivery_id, code)
+
+
+def _restore(name, snapshot_every, clock):
+    dm = _manager(name, snapshot_every, clock)
+    t0 = time.perf_counter()
+    replayed = dm.restore()
+    return dm, replayed, time.perf_counter() - t0
+
+
+def crash_on_last_stop(drop_completed: bool) -> bool:
+    """
+    Entrega las 7 paradas de una tanda y el proceso muere sin close(): o el
+    snapshot cae en la última entrega, o no llegó a anotar el "completed".
+    """
+    name = f"crash_{'sin_completed' if drop_completed else 'snapshot'}"
+    clock = VirtualClock()
+    dm = _manager(name, 10**9, clock)
+    dm.register_delivery("delivery_0")
+    for i in range(1, 8):
+        dm.enqueue_order(Order(id=i, user=f"5989{i:08d}", code="", total=500.0,
+                               lat=RESTAURANT_COORDS[0] + 0.002 * i, lon=RESTAURANT_COORDS[1] - 0.002 * i,
+                               created_at=clock.now))
+    codes = list(dm.tandas[1]["pending_codes"])
+    for code in codes[:-1]:
+        dm.verify_and_mark_delivered("delivery_0", code)
+    if not drop_completed:
+        dm.snapshot_every = dm._since_snapshot + 1
+    dm.verify_and_mark_delivered("delivery_0", codes[-1])
+    dm.journal.close()
+
+    if drop_completed:
+        # el proceso murió entre el "delivered" y el "completed"
+        segment = dm.journal._segments()[-1]
+        with open(segment, encoding="utf-8") as f:
+            lines = f.readlines()
+        with open(segment, "w", encoding="utf-8") as f:
+            f.writelines(line for line in lines if '"e":"completed"' not in line)
+
+    restored, _, _ = _restore(name, 10**9, clock)
+    restored.journal.close()
+    return (restored.deliveries["delivery_0"]["status"] == "available"
+            and "delivery_0" in restored.idle_couriers)
+
+
+def _place_order(cart, dm, phone, i):
+    user = User(phone)
+    user.cart.append({"product": {"id": "1", "nombre": "Pizza", "precio": 500}, "qty": 1, "note": ""})
+    order = cart.create_order(user, lat=RESTAURANT_COORDS[0] + 0.002 * i, lon=RESTAURANT_COORDS[1] + 0.002 * i)
+    return dm.enqueue_order(order)
+
+
+def crash_without_drain() -> bool:
+    """
+    3 pedidos pendientes y el proceso muere sin CART.orders.drain() ni
+    flush del archivo: el pedido nuevo tras reiniciar no reusa un id.
+    """
+    name = "crash_sin_drain"
+    clock = VirtualClock()
+    dm = _manager(name, 10**9, clock)
+    cart = CartManager(archive=dm.archive)
+    for i in range(1, 4):
+        _place_order(cart, dm, f"5989{i:08d}", i)
+    dm.journal.close()
+
+    restored, _, _ = _restore(name, 10**9, clock)
+    cart = CartManager(archive=restored.archive)
+    cart.reserve_ids_through(restored.max_order_id())   # lo que hace main.py
+    new = _place_order(cart, restored, "598900000099", 4)
+    restored.journal.close()
+
+    queue = restored.zone_queues[new.zone]
+    ids = [o.id for q in restored.zone_queues.values() for o in q.all()]
+    return new.id == 4 and sorted(ids) == [1, 2, 3, 4] and len(queue) == len(queue.all())
+
+
+def main():
+    print(f"{ORDERS:,} pedidos, {COURIERS} deliveries")
+    for name, every in (("sin_snapshots", 10**9), ("snapshot_c2000", 2000)):
+        clock = VirtualClock()
+        dm = _manager(name, every, clock)
+        simulate_day(dm, clock)
+        expected = dm.export_state()
+        events = dm.journal.seq
+        dm.flush_history()
+        dm.archive.flush()
+        dm.journal.close()
+
+        restored, replayed, elapsed = _restore(name, every, clock)
+        ok = restored.export_state() == expected
+        print(f"  {name:<16} {events:>7,} eventos  reproducidos {replayed:>7,}  "
+              f"{elapsed * 1000:>8.1f} ms  estado igual: {'sí' if ok else 'NO'}")
+        restored.journal.close()
+
+    for drop_completed in (False, True):
+        ok = crash_on_last_stop(drop_completed)
+        label = "sin \"completed\"" if drop_completed else "snapshot en la última parada"
+        print(f"  crash tras la última entrega ({label}): delivery libre: {'sí' if ok else 'NO'}")
+
+    ok = crash_without_drain()
+    print(f"  crash sin vaciar pedidos al archivo: ids sin repetir: {'sí' if ok else 'NO'}")
+
+
+if __name__ == "__main__":
+    main()
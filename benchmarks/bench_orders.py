@@ -0,0 +1,112 @@
+# benchmarks/bench_orders.py
+"""
+Pedido como dict (forma anterior) vs. Order con __slots__
+(structures/data_models): memoria por pedido con todos los campos del
+circuito completos, costo de los accesos que hacen enqueue_order / armado
+de tanda / verify_and_mark_delivered, y conversión a/desde JSON.
+
+    python -m benchmarks.bench_orders
+"""
+import gc
+import time
+import timeit
+import tracemalloc
+
+from structures.data_models import Order, OrderItem
+
+N = 100_000
+CALLS = 200_000
+
+
+def make_dict(i):
+    order = {
+        "id": i, "code": "ABC123", "user": "59891234567",
+        "items": [{"id": "p1", "nombre": "Pizza", "qty": 2, "price": 520.0, "note": ""}],
+        "total": 1040.0, "lat": -31.38, "lon": -57.96,
+        "created_at": time.time(), "status": "pending",
+    }
+    # claves que agregaba el DeliveryManager en cada etapa
+    order["distance_km"] = 1.2
+    order["zone"] = "G0_0"
+    order["enqueued_at"] = time.time()
+    order["eta_min"], order["eta_p90_min"] = 20, 30
+    order["leg_km"] = 0.4
+    order["tanda_id"] = 1
+    order["assigned_at"] = time.time()
+    order["delivered_at"] = time.time()
+    order["delivered_by"] = "delivery_1"
+    return order
+
+
+def make_order(i):
+    order = Order(
+        id=i, user="59891234567", code="ABC123",
+        items=[OrderItem("p1", "Pizza", 2, 520.0)],
+        total=1040.0, lat=-31.38, lon=-57.96, created_at=time.time(),
+    )
+    order.distance_km = 1.2
+    order.zone = "G0_0"
+    order.enqueued_at = time.time()
+    order.eta_min, order.eta_p90_min = 20, 30
+    order.leg_km = 0.4
+    order.tanda_id = 1
+    order.assigned_at = time.time()
+    order.delivered_at = time.time()
+    order.delivered_by = "delivery_1"
+    return order
+
+
+def memory(make):
+    gc.collect()
+    tracemalloc.start()
+    orders = [make(i) for i in range(N)]
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del orders
+    return current / N
+
+
+def hot_path_dict(o):
+    # lo que leen/escriben enqueue_order, la tanda y la verificación
+    lat, lon = o.get("lat"), o.get("lon")
+    o["distance_km"] = 1.2
+    o["zone"] = "G0_0"
+    o["status"] = "pending"
+    o["tanda_id"] = 1
+    o["status"] = "delivered"
+    return o["code"], o.get("tanda_id"), o["lat"], o["lon"], o.get("enqueued_at"), lat, lon
+
+
+def hot_path_order(o):
+    lat, lon = o.lat, o.lon
+    o.distance_km = 1.2
+    o.zone = "G0_0"
+    o.status = "pending"
+    o.tanda_id = 1
+    o.status = "delivered"
+    return o.code, o.tanda_id, o.lat, o.lon, o.enqueued_at, lat, lon
+
+
+def main():
+    print(f"memoria ({N:,} pedidos completos)")
+    d_mem, o_mem = memory(make_dict), memory(make_order)
+    print(f"  dict   {d_mem:>7.0f} B/pedido")
+    print(f"  Order  {o_mem:>7.0f} B/pedido   ({100 * (1 - o_mem / d_mem):.0f}% menos)")
+
+    d, o = make_dict(1), make_order(1)
+    t_d = min(timeit.repeat(lambda: hot_path_dict(d), number=CALLS, repeat=5)) / CALLS * 1e9
+    t_o = min(timeit.repeat(lambda: hot_path_order(o), number=CALLS, repeat=5)) / CALLS * 1e9
+    print("accesos del circuito de delivery (por pedido)")
+    print(f"  dict   {t_d:>7.0f} ns")
+    print(f"  Order  {t_o:>7.0f} ns   ({100 * (1 - t_o / t_d):.0f}% menos)")
+
+    t_to = min(timeit.repeat(o.to_dict, number=CALLS, repeat=5)) / CALLS * 1e9
+    data = o.to_dict()
+    t_from = min(timeit.repeat(lambda: Order.from_dict(data), number=CALLS, repeat=5)) / CALLS * 1e9
+    print("conversión (archivo / IPC)")
+    print(f"  to_dict    {t_to:>7.0f} ns")
+    print(f"  from_dict  {t_from:>7.0f} ns")
+
+
+if __name__ == "__main__":
+    main()
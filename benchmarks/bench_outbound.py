@@ -0,0 +1,120 @@
+# benchmarks/bench_outbound.py
+"""
+OutboundDispatcher contra el mock local de la Graph API
+(benchmarks/mock_graph.py), sin salir a Meta.
+
+- Orden: dos envíos al mismo número llegan en orden (el segundo recién
+  sale cuando respondieron el primero) mientras otro destinatario se
+  atiende en paralelo.
+- Carga: muchos destinatarios con varios mensajes cada uno; verifica el
+  orden por número y muestra throughput y latencia (p50 / p95 / max).
+
+    python -m benchmarks.bench_outbound
+"""
+import asyncio
+import os
+import socket
+import time
+
+import uvicorn
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+PORT = _free_port()
+# antes de importar whatsapp_service: apunta el cliente al mock
+os.environ["WHATSAPP_API_URL"] = f"http://127.0.0.1:{PORT}/mock/messages"
+
+from benchmarks import mock_graph  # noqa: E402
+from whatsapp_service import OUTBOUND, close_clients, send_whatsapp_text  # noqa: E402
+
+RECIPIENTS = 200
+MESSAGES_PER_RECIPIENT = 5
+
+
+async def _wait_drained(timeout: float = 60.0):
+    deadline = time.monotonic() + timeout
+    while OUTBOUND.queue_depth() and time.monotonic() < deadline:
+        await asyncio.sleep(0.01)
+
+
+def _in_order(records) -> bool:
+    """Por número: textos en el orden enviado y sin solaparse."""
+    by_number = {}
+    for r in records:
+        by_number.setdefault(r["to"], []).append(r)
+    for rs in by_number.values():
+        if [r["text"] for r in rs] != sorted((r["text"] for r in rs), key=lambda t: int(t.split("#")[1])):
+            return False
+        if any(a["finished"] > b["started"] for a, b in zip(rs, rs[1:])):
+            return False
+    return True
+
+
+async def check_ordering() -> bool:
+    mock_graph.reset()
+    mock_graph.DELAYS["59800000001"] = 0.3   # el lento
+    mock_graph.DELAYS["59800000002"] = 0.02
+
+    send_whatsapp_text("59800000001", "carrito #1")
+    send_whatsapp_text("59800000001", "botones #2")
+    send_whatsapp_text("59800000002", "hola #1")
+    await _wait_drained()
+
+    slow = [r for r in mock_graph.RECEIVED if r["to"] == "59800000001"]
+    fast = [r for r in mock_graph.RECEIVED if r["to"] == "59800000002"]
+    ordered = [r["text"] for r in slow] == ["carrito #1", "botones #2"] and \
+        slow[0]["finished"] <= slow[1]["started"]
+    # el otro número no esperó detrás del lento
+    concurrent = fast[0]["finished"] < slow[0]["finished"]
+    print(f"  mismo número en orden: {'sí' if ordered else 'NO'}   "
+          f"otro número en paralelo: {'sí' if concurrent else 'NO'}")
+    return ordered and concurrent
+
+
+async def load() -> bool:
+    mock_graph.reset()
+    total = RECIPIENTS * MESSAGES_PER_RECIPIENT
+    t0 = time.perf_counter()
+    for m in range(MESSAGES_PER_RECIPIENT):
+        for r in range(RECIPIENTS):
+            send_whatsapp_text(f"5989{r:07d}", f"msg #{m}")
+    await _wait_drained()
+    elapsed = time.perf_counter() - t0
+
+    ok = len(mock_graph.RECEIVED) == total and _in_order(mock_graph.RECEIVED)
+    stats = OUTBOUND.stats()
+    lat = stats["latency_ms"]
+    print(f"  {total:,} envíos a {RECIPIENTS} números, {OUTBOUND.workers} workers: "
+          f"{elapsed:.2f} s ({total / elapsed:,.0f} msg/s)  "
+          f"latencia p50 {lat['p50']} ms  p95 {lat['p95']} ms  max {lat['max']} ms  "
+          f"orden por número: {'sí' if ok else 'NO'}")
+    return ok
+
+
+async def main():
+    server = uvicorn.Server(uvicorn.Config(mock_graph.app, host="127.0.0.1", port=PORT, log_level="warning"))
+    serving = asyncio.create_task(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.01)
+
+    OUTBOUND.start()
+    try:
+        print(f"mock Graph API en {os.environ['WHATSAPP_API_URL']}")
+        ok = await check_ordering()
+        ok = await load() and ok
+    finally:
+        await OUTBOUND.stop()
+        await close_clients()
+        server.should_exit = True
+        await serving
+    if not ok:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,59 @@
+# benchmarks/bench_router.py
+"""
+Costo de despacho del InteractionRouter vs. una cadena if/startswith
+a medida que crece la cantidad de acciones registradas.
+
+    python -m benchmarks.bench_router
+"""
+import timeit
+
+from utils.interaction_router import InteractionRouter
+
+SIZES = (10, 100, 1000, 5000)
+CALLS = 20000
+
+
+def _noop(*args, **kwargs):
+    pass
+
+
+def build_router(n):
+    router = InteractionRouter("bench")
+    for i in range(n):
+        router.add(f"act{i}_fixed", _noop)
+        router.add(f"act{i}_{{idx:int}}", _noop)
+    return router
+
+
+def build_chain(n):
+    prefixes = [f"act{i}_" for i in range(n)]
+
+    def dispatch(key):
+        for p in prefixes:
+            if key.startswith(p):
+                rest = key[len(p):]
+                if rest == "fixed":
+                    return _noop()
+                return _noop(idx=int(rest))
+        return None
+
+    return dispatch
+
+
+def main():
+    print(f"{'acciones':>9} | {'router µs':>10} | {'if-chain µs':>11}")
+    for n in SIZES:
+        router = build_router(n)
+        chain = build_chain(n)
+        # peor caso para la cadena: la última acción registrada
+        keys = (f"act{n - 1}_fixed", f"act{n - 1}_42")
+
+        t_router = timeit.timeit(lambda: [router.dispatch(k) for k in keys], number=CALLS)
+        t_chain = timeit.timeit(lambda: [chain(k) for k in keys], number=CALLS)
+
+        per = 1e6 / (CALLS * len(keys))
+        print(f"{n:>9} | {t_router * per:>10.2f} | {t_chain * per:>11.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+# benchmarks/bench_sessions.py
+"""
+Memoria por sesión con 1M de teléfonos distintos (campaña con números de
+una sola vez): User anterior (con __dict__, phone/number duplicados y
+_filtered) vs. User con __slots__, y UserManager sin tope vs. con tope LRU.
+
+    python -m benchmarks.bench_sessions
+"""
+import gc
+import time
+import tracemalloc
+
+from algorithms.users_and_cart import User, UserManager
+
+PHONES = 1_000_000
+CAP = 100_000
+
+
+class LegacyUser:
+    """Copia del User anterior, solo para comparar."""
+
+    def __init__(self, phone: str):
+        self.phone = phone
+        self.number = phone
+        self.created_at = time.time()
+        self.name = None
+        self.state = "idle"
+        self.category = "Todos"
+        self.sort = None
+        self.page = 0
+        self._filtered = []
+        self.pending_product_id = None
+        self.pending_qty = None
+        self.cart = []
+
+
+def _phones(n):
+    return [f"5989{i:08d}" for i in range(n)]
+
+
+def _measure(label, build, phones):
+    gc.collect()
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    holder = build(phones)
+    elapsed = time.perf_counter() - t0
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    alive = len(holder)
+    print(f"{label:<34} {alive:>9,} vivas  {current / len(phones):>7.0f} B/teléfono  "
+          f"{current / 2**20:>8.1f} MiB  {elapsed:>6.2f} s")
+    del holder
+    gc.collect()
+
+
+def legacy_dict(phones):
+    users = {}
+    for p in phones:
+        if p not in users:
+            users[p] = LegacyUser(p)
+    return users
+
+
+def slots_dict(phones):
+    return {p: User(p) for p in phones}
+
+
+def manager(cap):
+    def build(phones):
+        m = UserManager(ttl_seconds=None, max_users=cap)
+        for p in phones:
+            m.get(p)
+        return m.users
+    return build
+
+
+def main():
+    phones = _phones(PHONES)  # los strings de teléfono no se cuentan
+    print(f"{PHONES:,} teléfonos distintos")
+    _measure("dict + User anterior", legacy_dict, phones)
+    _measure("dict + User __slots__", slots_dict, phones)
+    _measure("UserManager sin tope", manager(None), phones)
+    _measure(f"UserManager tope LRU {CAP:,}", manager(CAP), phones)
+
+
+if __name__ == "__main__":
+    main()
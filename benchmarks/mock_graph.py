@@ -0,0 +1,54 @@
+# benchmarks/mock_graph.py
+"""
+Mock local de la Graph API de WhatsApp (solo POST /{phone_id}/messages).
+
+Anota cada envío con su hora de llegada y de respuesta, y demora la
+respuesta según el destinatario, para probar el OutboundDispatcher sin
+salir a Meta:
+
+    uvicorn benchmarks.mock_graph:app --port 9999
+    WHATSAPP_API_URL=http://127.0.0.1:9999/mock/messages uvicorn main:app
+"""
+import asyncio
+import itertools
+import os
+import time
+from typing import Dict, List
+
+from fastapi import FastAPI, Request
+
+# demora de la respuesta por número (segundos); el resto usa DEFAULT_DELAY
+DEFAULT_DELAY = float(os.getenv("MOCK_GRAPH_DELAY_MS", 20)) / 1000
+DELAYS: Dict[str, float] = {}
+
+# un registro por envío, en orden de llegada
+RECEIVED: List[dict] = []
+
+_ids = itertools.count(1)
+
+app = FastAPI()
+
+
+@app.post("/{phone_id}/messages")
+async def messages(phone_id: str, request: Request):
+    payload = await request.json()
+    to = payload.get("to")
+    record = {
+        "to": to,
+        "text": (payload.get("text") or {}).get("body"),
+        "started": time.monotonic(),
+    }
+    RECEIVED.append(record)
+
+    await asyncio.sleep(DELAYS.get(to, DEFAULT_DELAY))
+    record["finished"] = time.monotonic()
+    return {
+        "messaging_product": "whatsapp",
+        "contacts": [{"input": to, "wa_id": to}],
+        "messages": [{"id": f"wamid.mock-{next(_ids)}"}],
+    }
+
+
+def reset():
+    RECEIVED.clear()
+    DELAYS.clear()
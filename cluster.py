@@ -0,0 +1,212 @@
+# cluster.py
+"""
+Modo multi-proceso en una sola máquina.
+
+  proceso dueño : python -m algorithms.delivery_ipc   (tandas y deliveries)
+  N workers     : uvicorn main:app en puertos internos; cada uno es dueño
+                  de los usuarios que le tocan por hash consistente del número
+  front (este)  : recibe el webhook de Meta, valida la firma y reenvía cada
+                  mensaje al worker dueño de su `from`
+
+    CLUSTER_WORKERS=4 python cluster.py
+
+CLUSTER_WORKERS es obligatoria (en un contenedor os.cpu_count() es la
+cantidad de cores del host, no lo que tiene asignado el dyno).
+
+Un mismo número siempre cae en el mismo worker, así que su sesión, su
+carrito y el orden de sus mensajes siguen siendo locales a un proceso.
+"""
+import asyncio
+import hashlib
+import hmac
+import json
+import os
+import secrets
+import signal
+import subprocess
+import sys
+from contextlib import asynccontextmanager
+
+import httpx
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, Response
+
+from utils.hash_ring import ConsistentHashRing
+
+PORT = int(os.getenv("PORT", 10000))
+CLUSTER_WORKERS = int(os.getenv("CLUSTER_WORKERS") or 0)
+CLUSTER_BASE_PORT = int(os.getenv("CLUSTER_BASE_PORT", 10100))
+CLUSTER_TOKEN = os.getenv("CLUSTER_TOKEN") or secrets.token_hex(16)
+# el servidor IPC deserializa lo que recibe: la clave nunca tiene default fijo
+DELIVERY_IPC_AUTHKEY = os.getenv("DELIVERY_IPC_AUTHKEY") or secrets.token_hex(32)
+DELIVERY_IPC_ADDRESS = os.getenv("DELIVERY_IPC_ADDRESS", "127.0.0.1:50055")
+APP_SECRET = os.getenv("WHATSAPP_APP_SECRET")
+
+WORKER_URLS = [f"http://127.0.0.1:{CLUSTER_BASE_PORT + i}" for i in range(CLUSTER_WORKERS)]
+RING = ConsistentHashRing(WORKER_URLS)
+
+_client: httpx.AsyncClient | None = None
+
+
+# ==========================================================
+# FRONT
+# ==========================================================
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    global _client
+    _client = httpx.AsyncClient(
+        timeout=10.0,
+        limits=httpx.Limits(max_connections=100 * CLUSTER_WORKERS, max_keepalive_connections=20 * CLUSTER_WORKERS),
+    )
+    yield
+    await _client.aclose()
+    _client = None
+
+
+app = FastAPI(lifespan=lifespan)
+
+
+def _valid_signature(raw: bytes, header: str | None) -> bool:
+    if not APP_SECRET:
+        return True
+    expected = "sha256=" + hmac.new(APP_SECRET.encode(), raw, hashlib.sha256).hexdigest()
+    return bool(header) and hmac.compare_digest(expected, header)
+
+
+def split_by_worker(body: dict) -> dict:
+    """
+    Parte un webhook en un body por worker, con la misma forma
+    (entry → changes → value.messages) y respetando el orden de llegada.
+    """
+    parts = {}
+    for entry in body.get("entry") or []:
+        for change in entry.get("changes") or []:
+            value = change.get("value") or {}
+            for msg in value.get("messages") or []:
+                url = RING.node_for(str(msg.get("from")))
+                part = parts.setdefault(url, {"object": body.get("object"), "entry": []})
+                part["entry"].append({
+                    "id": entry.get("id"),
+                    "changes": [{
+                        "field": change.get("field"),
+                        "value": {**value, "messages": [msg]},
+                    }],
+                })
+    return parts
+
+
+def worker_for_order(order_id: int) -> str:
+    """Cada worker i crea los ids ≡ i + 1 (mód CLUSTER_WORKERS), ver CartManager."""
+    return WORKER_URLS[(order_id - 1) % len(WORKER_URLS)]
+
+
+async def _forward(method: str, url: str, request: Request, content: bytes | None = None):
+    headers = {"X-Cluster-Token": CLUSTER_TOKEN, "Content-Type": "application/json"}
+    if "x-admin-token" in request.headers:
+        headers["X-Admin-Token"] = request.headers["x-admin-token"]
+    return await _client.request(
+        method, url, params=request.query_params, headers=headers, content=content
+    )
+
+
+@app.post("/whatsapp")
+async def whatsapp_webhook(request: Request):
+    raw = await request.body()
+    if not _valid_signature(raw, request.headers.get("X-Hub-Signature-256")):
+        return JSONResponse({"status": "invalid signature"}, status_code=403)
+
+    try:
+        parts = split_by_worker(json.loads(raw))
+    except ValueError:
+        return JSONResponse({"status": "ok"})
+
+    results = await asyncio.gather(*(
+        _forward("POST", f"{url}/whatsapp", request, json.dumps(part).encode())
+        for url, part in parts.items()
+    ), return_exceptions=True)
+    for url, r in zip(parts, results):
+        if isinstance(r, Exception) or r.status_code >= 400:
+            print("⚠️ Worker no aceptó el webhook:", url, r)
+    return JSONResponse({"status": "ok"})
+
+
+@app.api_route("/{path:path}", methods=["GET", "POST"])
+async def passthrough(path: str, request: Request):
+    """
+    El resto va al worker dueño del `phone` de la query si viene, o al
+    primero. /admin/orders/{id} va al worker que creó el pedido (los
+    recientes están solo en su memoria). La recarga de catálogo se
+    replica en todos.
+    """
+    body = await request.body()
+    if path == "admin/catalog/reload":
+        results = await asyncio.gather(*(
+            _forward(request.method, f"{url}/{path}", request, body) for url in WORKER_URLS
+        ))
+        return JSONResponse([r.json() for r in results], status_code=max(r.status_code for r in results))
+
+    phone = request.query_params.get("phone")
+    order_id = path[len("admin/orders/"):] if path.startswith("admin/orders/") else ""
+    if order_id.isdigit() and int(order_id) > 0:
+        url = worker_for_order(int(order_id))
+    elif phone:
+        url = RING.node_for(phone)
+    else:
+        url = WORKER_URLS[0]
+    r = await _forward(request.method, f"{url}/{path}", request, body)
+    return Response(r.content, status_code=r.status_code, media_type=r.headers.get("content-type"))
+
+
+# ==========================================================
+# ARRANQUE DE PROCESOS
+# ==========================================================
+def _spawn(args, **extra_env) -> subprocess.Popen:
+    env = {**os.environ, **{k: str(v) for k, v in extra_env.items()}}
+    return subprocess.Popen([sys.executable, *args], env=env)
+
+
+def main():
+    if CLUSTER_WORKERS < 1:
+        sys.exit("❌ Definí CLUSTER_WORKERS (cantidad de workers uvicorn)")
+
+    owner = _spawn(
+        ["-m", "algorithms.delivery_ipc"],
+        DELIVERY_IPC_ADDRESS=DELIVERY_IPC_ADDRESS,
+        DELIVERY_IPC_AUTHKEY=DELIVERY_IPC_AUTHKEY,
+    )
+    workers = [
+        _spawn(
+            ["-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(CLUSTER_BASE_PORT + i)],
+            DELIVERY_IPC_ADDRESS=DELIVERY_IPC_ADDRESS,
+            DELIVERY_IPC_AUTHKEY=DELIVERY_IPC_AUTHKEY,
+            CLUSTER_TOKEN=CLUSTER_TOKEN,
+            WORKER_INDEX=i,
+            WORKER_COUNT=CLUSTER_WORKERS,
+        )
+        for i in range(CLUSTER_WORKERS)
+    ]
+    print(f"🧩 Cluster: {CLUSTER_WORKERS} workers, delivery en {DELIVERY_IPC_ADDRESS}")
+    # uvicorn vuelve a emitir SIGTERM al terminar: que salga por el finally
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    try:
+        uvicorn.run(app, host="0.0.0.0", port=PORT)
+    finally:
+        # primero los workers (vacían sus colas), después el dueño de las tandas
+        for p in workers:
+            p.terminate()
+        for p in workers:
+            try:
+                # alcanza para WEBHOOK_DRAIN_SECONDS + el vaciado de OUTBOUND
+                p.wait(timeout=30)
+            except subprocess.TimeoutExpired:
+                p.kill()
+        owner.terminate()
+        try:
+            owner.wait(timeout=15)
+        except subprocess.TimeoutExpired:
+            owner.kill()
+
+
+if __name__ == "__main__":
+    main()
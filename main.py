@@ -1,6 +1,13 @@
+import asyncio
+import hashlib
+import hmac
+import json
 import os
+import time
+from contextlib import asynccontextmanager
+
 import uvicorn
-from fastapi import FastAPI, Request
+from fastapi import FastAPI, Request, Header
 from fastapi.responses import PlainTextResponse, JSONResponse
 
 from algorithms.catalog_logic import (
@@ -14,22 +21,127 @@ from algorithms.catalog_logic import (
     CART,
     send_cart,
     send_edit_menu,
-    send_edit_actions
+    send_edit_actions,
+    MENU_CACHE,
+    CATALOG_STORE
 )
 
-from whatsapp_service import send_whatsapp_buttons, send_whatsapp_text
+from utils.dedup_cache import DedupCache
+from utils.get_type_message import iter_webhook_messages
+from utils.interaction_router import InteractionRouter
+from utils.keyed_locks import KeyedLocks
+from utils.order_archive import ORDER_ARCHIVE
+from utils.session_store import SESSION_STORE
+from utils.work_queue import SheddingQueue
+from whatsapp_service import send_whatsapp_buttons, send_whatsapp_text, close_clients, OUTBOUND
 
 # ---------------------------------------------------------
 # IMPORTAR DELIVERY MANAGER
 # ---------------------------------------------------------
+# Con DELIVERY_IPC_ADDRESS (modo cluster) el DeliveryManager vive en otro
+# proceso (algorithms/delivery_ipc.py) y aquí se usa un proxy.
+DELIVERY_IPC = bool(os.getenv("DELIVERY_IPC_ADDRESS"))
 try:
-    from algorithms.delivery_manager import DELIVERY_MANAGER
+    if DELIVERY_IPC:
+        from algorithms.delivery_ipc import connect_delivery_manager
+        DELIVERY_MANAGER = connect_delivery_manager(os.environ["DELIVERY_IPC_ADDRESS"])
+        TANDA_SCHEDULER = None  # corre en el proceso dueño
+    else:
+        from algorithms.delivery_manager import DELIVERY_MANAGER, TANDA_SCHEDULER
 except Exception as e:
     print("⚠️ DELIVERY_MANAGER no disponible:", e)
     DELIVERY_MANAGER = None
+    TANDA_SCHEDULER = None
 
-app = FastAPI()
+# ---------------------------------------------------------
+# CICLO DE VIDA (pool HTTP + cola saliente)
+# ---------------------------------------------------------
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    OUTBOUND.start()
+    _consumers.extend(asyncio.create_task(_consume_work_queue()) for _ in range(WEBHOOK_WORKERS))
+    scheduler = asyncio.create_task(TANDA_SCHEDULER.run()) if TANDA_SCHEDULER else None
+    watcher = None
+    if os.getenv("CATALOG_WATCH", "1") == "1":
+        watcher = asyncio.create_task(
+            CATALOG_STORE.watch(float(os.getenv("CATALOG_WATCH_INTERVAL", 5)))
+        )
+    write_behind = asyncio.create_task(_write_behind())
+    yield
+    # lo encolado ya se respondió con 200 (Meta no lo reenvía): procesarlo antes de cortar
+    await _drain_work_queue(float(os.getenv("WEBHOOK_DRAIN_SECONDS", 10)))
+    write_behind.cancel()
+    if watcher:
+        watcher.cancel()
+    if scheduler:
+        scheduler.cancel()
+    for t in _consumers:
+        t.cancel()
+    await asyncio.gather(*_consumers, return_exceptions=True)
+    _consumers.clear()
+    await OUTBOUND.stop()
+    await close_clients()
+    if DELIVERY_MANAGER and not DELIVERY_IPC:
+        DELIVERY_MANAGER.close()
+    CART.orders.drain()
+    ORDER_ARCHIVE.close()
+    SESSION_STORE.close()
+
+
+async def _write_behind():
+    """
+    Escribe sesiones, historial archivado, el modelo de ETA y el snapshot
+    de entregas pendiente en lotes, fuera del event loop. De paso libera las sesiones
+    inactivas.
+    """
+    interval = float(os.getenv("WRITE_BEHIND_SECONDS", 5))
+    while True:
+        await asyncio.sleep(interval)
+        USERS.evict_idle()
+        try:
+            await asyncio.to_thread(SESSION_STORE.flush)
+        except Exception as e:
+            print("⚠️ Error guardando sesiones:", e)
+        try:
+            await asyncio.to_thread(ORDER_ARCHIVE.flush)
+        except Exception as e:
+            print("⚠️ Error escribiendo el archivo de pedidos:", e)
+        if DELIVERY_MANAGER and not DELIVERY_IPC:
+            # la copia del modelo se toma en el loop; el archivo, en un thread
+            eta_model = DELIVERY_MANAGER.eta.export_if_dirty()
+            if eta_model is not None:
+                await asyncio.to_thread(DELIVERY_MANAGER.eta.write, eta_model)
+            try:
+                await asyncio.to_thread(DELIVERY_MANAGER.write_snapshot)
+            except Exception as e:
+                print("⚠️ Error guardando el snapshot de entregas:", e)
+
+
+app = FastAPI(lifespan=lifespan)
 VERIFY_TOKEN = os.getenv("VERIFY_TOKEN", "token123")
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN")
+
+APP_SECRET = os.getenv("WHATSAPP_APP_SECRET")
+# en modo cluster el front ya validó la firma de Meta y reenvía con este token
+CLUSTER_TOKEN = os.getenv("CLUSTER_TOKEN")
+
+# serializa el procesamiento por usuario
+USER_LOCKS = KeyedLocks()
+
+# IDs de mensajes ya vistos (reintentos de Meta)
+DEDUP = DedupCache(
+    ttl_seconds=float(os.getenv("DEDUP_TTL_SECONDS", 3600)),
+    maxsize=int(os.getenv("DEDUP_MAX", 100_000)),
+)
+
+# cola interna del webhook: se responde 200 al instante y se procesa aparte
+WEBHOOK_WORKERS = int(os.getenv("WEBHOOK_WORKERS", 4))
+WORK_QUEUE = SheddingQueue(maxsize=int(os.getenv("WEBHOOK_QUEUE_MAX", 1000)))
+_consumers = []
+
+PRIORITY_COURIER = 0   # confirmaciones "entrego" de los deliveries
+PRIORITY_CHECKOUT = 1  # carrito, cantidades, notas, ubicación
+PRIORITY_BROWSING = 2  # navegar el catálogo
 
 
 # ---------------------------------------------------------
@@ -39,6 +151,18 @@ def get_user_obj(phone: str):
     return USERS.get(phone)
 
 
+# ---------------------------------------------------------
+# Ids de pedidos tras un crash
+# ---------------------------------------------------------
+# los últimos pedidos no llegaron al archivo, pero el journal del
+# DeliveryManager sí los recuperó: los ids nuevos siguen después de esos
+try:
+    if DELIVERY_MANAGER:
+        CART.reserve_ids_through(DELIVERY_MANAGER.max_order_id())
+except Exception as e:
+    print("⚠️ Error recuperando el último id de pedido:", e)
+
+
 # ---------------------------------------------------------
 # Registrar deliveries de prueba
 # ---------------------------------------------------------
@@ -88,6 +212,77 @@ async def root():
     return {"status": "ok", "message": "Bot activo"}
 
 
+@app.get("/stats/outbound")
+async def outbound_stats():
+    return OUTBOUND.stats()
+
+
+@app.get("/stats/menu_cache")
+async def menu_cache_stats():
+    return MENU_CACHE.stats()
+
+
+@app.get("/stats/webhook")
+async def webhook_stats():
+    return {"consumers": len(_consumers), **WORK_QUEUE.stats(), "dedup": DEDUP.stats(),
+            "sessions": {**USERS.stats(), "store": SESSION_STORE.stats()}}
+
+
+@app.get("/stats/delivery")
+async def delivery_stats(x_admin_token: str | None = Header(default=None)):
+    """Va por número de delivery (teléfonos): solo con X-Admin-Token."""
+    if not ADMIN_TOKEN or x_admin_token != ADMIN_TOKEN:
+        return JSONResponse({"status": "forbidden"}, status_code=403)
+
+    if not DELIVERY_MANAGER:
+        return JSONResponse({"status": "unavailable"}, status_code=503)
+    return {"totals": await delivery_call("get_stats"), **await delivery_call("get_live_stats")}
+
+
+# ==========================================================
+# ADMIN
+# ==========================================================
+@app.post("/admin/catalog/reload")
+async def admin_reload_catalog(x_admin_token: str | None = Header(default=None)):
+    if not ADMIN_TOKEN or x_admin_token != ADMIN_TOKEN:
+        return JSONResponse({"status": "forbidden"}, status_code=403)
+
+    changed = await CATALOG_STORE.reload_async()
+    return {"status": "ok" if changed else "error", **CATALOG_STORE.info()}
+
+
+@app.get("/admin/orders/{order_id}")
+async def admin_get_order(order_id: int, x_admin_token: str | None = Header(default=None)):
+    if not ADMIN_TOKEN or x_admin_token != ADMIN_TOKEN:
+        return JSONResponse({"status": "forbidden"}, status_code=403)
+
+    order = CART.get_order(order_id)
+    if order is None:
+        return JSONResponse({"status": "not_found"}, status_code=404)
+    return order.to_dict()
+
+
+@app.get("/admin/orders")
+async def admin_list_orders(phone: str | None = None, day: str | None = None,
+                            x_admin_token: str | None = Header(default=None)):
+    """Historial por teléfono o por día (YYYY-MM-DD): memoria caliente + archivo."""
+    if not ADMIN_TOKEN or x_admin_token != ADMIN_TOKEN:
+        return JSONResponse({"status": "forbidden"}, status_code=403)
+
+    if phone:
+        recent = [o for o in CART.orders if o.user == phone]
+        archived = await asyncio.to_thread(ORDER_ARCHIVE.by_phone, phone)
+    elif day:
+        recent = [o for o in CART.orders if time.strftime("%Y-%m-%d", time.localtime(o.created_at)) == day]
+        archived = await asyncio.to_thread(ORDER_ARCHIVE.by_day, day)
+    else:
+        return JSONResponse({"status": "error", "detail": "phone o day"}, status_code=400)
+
+    hot_ids = {o.id for o in recent}
+    orders = [o.to_dict() for o in recent] + [o for o in archived if o.get("id") not in hot_ids]
+    return {"orders": orders, **ORDER_ARCHIVE.stats()}
+
+
 @app.get("/whatsapp")
 async def verify(request: Request):
     params = request.query_params
@@ -99,255 +294,404 @@ async def verify(request: Request):
 # ==========================================================
 # WEBHOOK PRINCIPAL
 # ==========================================================
+def _valid_signature(raw: bytes, header: str | None) -> bool:
+    if not APP_SECRET:
+        return True
+    expected = "sha256=" + hmac.new(APP_SECRET.encode(), raw, hashlib.sha256).hexdigest()
+    return bool(header) and hmac.compare_digest(expected, header)
+
+
 @app.post("/whatsapp")
 async def whatsapp_webhook(request: Request):
+    raw = await request.body()
+    from_front = bool(CLUSTER_TOKEN) and hmac.compare_digest(
+        request.headers.get("X-Cluster-Token", ""), CLUSTER_TOKEN
+    )
+    if not from_front and not _valid_signature(raw, request.headers.get("X-Hub-Signature-256")):
+        return JSONResponse({"status": "invalid signature"}, status_code=403)
+
     try:
-        body = await request.json()
+        body = json.loads(raw)
         print("📥 WEBHOOK:", body)
 
-        entry = body.get("entry", [])[0]
-        changes = entry.get("changes", [])[0]
-        value = changes.get("value", {})
-        messages = value.get("messages", [])
-
+        messages = [
+            msg for msg in iter_webhook_messages(body)
+            if not (msg.get("id") and DEDUP.check_and_add(msg["id"]))
+        ]
         if not messages:
             return JSONResponse({"status": "ok"})
 
-        msg = messages[0]
-        user_number = msg.get("from")
-        user = get_user_obj(user_number)
-
-        # ========= LISTA =========
-        row_id = get_list_id(msg)
-        if row_id:
-            handle_list_reply(user_number, row_id)
+        # sin consumidores (ej: sin lifespan) se procesa en línea
+        if not _consumers:
+            await handle_messages(messages)
             return JSONResponse({"status": "ok"})
 
-        # ========= BOTÓN =========
-        btn_id = get_button_id(msg)
-        if btn_id:
-            handle_button_reply(user_number, btn_id)
-            return JSONResponse({"status": "ok"})
+        for msg in messages:
+            if not WORK_QUEUE.put_nowait(msg, message_priority(msg)):
+                print("⚠️ Cola llena, mensaje descartado:", msg.get("id"))
 
-        # ========= UBICACIÓN =========
-        if msg.get("type") == "location":
-            user = get_user_obj(user_number)
-
-            if getattr(user, "state", "") != "awaiting_location":
-                send_whatsapp_text(user_number, "No estoy esperando ubicación. Escribe *menu*.")
-                return JSONResponse({"status": "ok"})
+    except Exception as e:
+        print("❌ ERROR EN WEBHOOK:", e)
 
-            loc = msg.get("location", {})
-            lat = loc.get("latitude")
-            lon = loc.get("longitude")
+    return JSONResponse({"status": "ok"})
 
-            if lat is None or lon is None:
-                send_whatsapp_text(user_number, "No pude leer tu ubicación, enviála de nuevo.")
-                return JSONResponse({"status": "ok"})
 
-            # Crear orden
-            try:
-                order = CART.create_order(user, lat=lat, lon=lon)
-            except TypeError:
-                order = CART.create_order(user)
-                order["lat"] = lat
-                order["lon"] = lon
-
-            if order is None:
-                send_whatsapp_text(user_number, "Tu carrito está vacío.")
-                USERS.set_state(user_number, "browsing")
-                return JSONResponse({"status": "ok"})
-
-            if DELIVERY_MANAGER is None:
-                send_whatsapp_text(user_number, "Delivery no disponible.")
-                USERS.set_state(user_number, "browsing")
-                return JSONResponse({"status": "ok"})
-
-            # Encolarlo en delivery
+# ==========================================================
+# DESPACHO DE MENSAJES
+# ==========================================================
+MENU_COMMANDS = frozenset(("hola", "menu", "inicio", "start", "catalogo"))
+
+
+def is_courier_confirmation(text: str) -> bool:
+    """Texto "entrego <código>" o el código solo (ya en minúsculas)."""
+    return text.startswith("entrego ") or (len(text) == 6 and text.isalnum())
+
+
+def message_priority(msg) -> int:
+    """
+    Prioridad para descarte bajo carga (0 = nunca se descarta primero).
+    Listas y botones usan la prioridad de la ruta que los va a atender.
+    """
+    row_id = get_list_id(msg)
+    if row_id:
+        return LIST_ROUTER.priority_of(row_id, PRIORITY_BROWSING)
+
+    btn_id = get_button_id(msg)
+    if btn_id:
+        return BUTTON_ROUTER.priority_of(btn_id.strip().lower(), PRIORITY_BROWSING)
+
+    if msg.get("type") == "location":
+        return PRIORITY_CHECKOUT
+
+    if msg.get("type") == "text":
+        text = msg.get("text", {}).get("body", "").strip().lower()
+        if is_courier_confirmation(text):
+            return PRIORITY_COURIER
+        if text in MENU_COMMANDS:
+            return PRIORITY_BROWSING
+        # notas del carrito y respuestas del flujo de compra
+        return PRIORITY_CHECKOUT
+
+    return PRIORITY_BROWSING
+
+
+async def _consume_work_queue():
+    while True:
+        msg = await WORK_QUEUE.get()
+        try:
+            await _handle_user_messages(msg.get("from"), [msg])
+        finally:
+            WORK_QUEUE.task_done()
+
+
+async def _drain_work_queue(timeout: float):
+    """Espera a que los consumidores terminen lo encolado (o a que venza el plazo)."""
+    deadline = time.monotonic() + timeout
+    while WORK_QUEUE.unfinished() and time.monotonic() < deadline:
+        await asyncio.sleep(0.05)
+    if WORK_QUEUE.unfinished():
+        print("⚠️ Apagado con mensajes sin procesar:", WORK_QUEUE.unfinished())
+
+
+async def handle_messages(messages):
+    """
+    Meta agrupa varios mensajes por POST. Los de distintos usuarios se
+    procesan en paralelo; los de un mismo usuario, en serie y en orden
+    de llegada (también entre POSTs concurrentes, vía USER_LOCKS).
+    """
+    by_user = {}
+    for msg in messages:
+        by_user.setdefault(msg.get("from"), []).append(msg)
+
+    await asyncio.gather(*(
+        _handle_user_messages(user_number, user_msgs)
+        for user_number, user_msgs in by_user.items()
+    ))
+
+
+async def _handle_user_messages(user_number, user_msgs):
+    async with USER_LOCKS.lock(user_number):
+        try:
+            await USERS.hydrate(user_number)
+        except Exception as e:
+            print("⚠️ No se pudo recuperar la sesión de", user_number, e)
+        for msg in user_msgs:
             try:
-                enqueued_order = DELIVERY_MANAGER.enqueue_order(order)
+                await process_message(msg)
             except Exception as e:
-                print("❌ ERROR enqueue_order:", e)
-                send_whatsapp_text(user_number, "Error al procesar tu pedido.")
-                USERS.set_state(user_number, "browsing")
-                return JSONResponse({"status": "ok"})
-
-            # -----------------------------
-            # 🔥 RESPUESTA COMPLETA AL CLIENTE
-            # -----------------------------
-            dist = enqueued_order.get("distance_km")
-            eta = enqueued_order.get("eta_min")
-
-            msg_txt = (
-                f"✅ Pedido recibido.\n"
-                f"Tu código de entrega es *{enqueued_order.get('code')}*."
-            )
+                print("❌ ERROR procesando mensaje:", msg.get("id"), e)
+        USERS.mark_dirty(user_number)
+
+
+async def delivery_call(method: str, *args):
+    """
+    Llamada al DeliveryManager. En modo cluster es un round-trip IPC
+    bloqueante (serializado tras el lock del dueño): va a un thread para no
+    frenar el event loop. En local es una llamada en memoria y queda en el loop.
+    """
+    fn = getattr(DELIVERY_MANAGER, method)
+    if DELIVERY_IPC:
+        return await asyncio.to_thread(fn, *args)
+    return fn(*args)
+
+
+async def process_message(msg):
+    user_number = msg.get("from")
+    user = get_user_obj(user_number)
+
+    # ========= LISTA =========
+    row_id = get_list_id(msg)
+    if row_id:
+        handle_list_reply(user_number, row_id)
+        return
+
+    # ========= BOTÓN =========
+    btn_id = get_button_id(msg)
+    if btn_id:
+        handle_button_reply(user_number, btn_id)
+        return
+
+    # ========= UBICACIÓN =========
+    if msg.get("type") == "location":
+        user = get_user_obj(user_number)
+
+        # —— Ubicación de un delivery (para asignar por cercanía) ——
+        if DELIVERY_MANAGER and await delivery_call("is_courier", user_number):
+            loc = msg.get("location", {})
+            if loc.get("latitude") is not None and loc.get("longitude") is not None:
+                await delivery_call("update_delivery_position", user_number, loc["latitude"], loc["longitude"])
+                send_whatsapp_text(user_number, "📍 Ubicación actualizada.")
+            return
+
+        if getattr(user, "state", "") != "awaiting_location":
+            send_whatsapp_text(user_number, "No estoy esperando ubicación. Escribe *menu*.")
+            return
 
-            if dist:
-                msg_txt += f"\n📏 Distancia estimada: *{dist} km*."
-            if eta:
-                msg_txt += f"\n⏱️ Tiempo estimado de entrega: *{eta} minutos*."
+        loc = msg.get("location", {})
+        lat = loc.get("latitude")
+        lon = loc.get("longitude")
 
-            send_whatsapp_text(user_number, msg_txt)
+        if lat is None or lon is None:
+            send_whatsapp_text(user_number, "No pude leer tu ubicación, enviála de nuevo.")
+            return
+
+        # Crear orden
+        try:
+            order = CART.create_order(user, lat=lat, lon=lon)
+        except TypeError:
+            order = CART.create_order(user)
+            order.lat = lat
+            order.lon = lon
 
+        if order is None:
+            send_whatsapp_text(user_number, "Tu carrito está vacío.")
             USERS.set_state(user_number, "browsing")
-            return JSONResponse({"status": "ok"})
+            return
 
-        # ========= TEXTO =========
-        if msg.get("type") == "text":
-            text = msg["text"]["body"].strip().lower()
-
-            # —— Confirmación delivery —— 
-            if text.startswith("entrego ") or (len(text) == 6 and text.isalnum()):
-                parts = text.split()
-                code = parts[1] if text.startswith("entrego ") else text.upper()
-                delivery_id = user_number
-                ok = DELIVERY_MANAGER.verify_and_mark_delivered(delivery_id, code) if DELIVERY_MANAGER else False
-                send_whatsapp_text(
-                    user_number,
-                    "Código verificado ✔️" if ok else "Código inválido ❌"
-                )
-                return JSONResponse({"status": "ok"})
-
-            # —— Nota en carrito ——
-            if user.state == "adding_note":
-                save_cart_line(user_number, "" if text == "no" else text)
-                return JSONResponse({"status": "ok"})
-
-            # —— Comandos base ——
-            if text in ["hola", "menu", "inicio", "start", "catalogo"]:
-                USERS.reset_catalog_flow(user_number)
-                send_whatsapp_buttons(
-                    user_number,
-                    header="Menú principal",
-                    body="Selecciona una opción:",
-                    buttons=[
-                        {"id": "btn_catalogo", "title": "Ver catálogo"},
-                        {"id": "btn_carrito", "title": "Ver carrito"},
-                        {"id": "btn_info", "title": "Información"},
-                    ],
-                )
-                return JSONResponse({"status": "ok"})
-
-            send_whatsapp_text(user_number, "No entendí 🤖. Escribe *menu*.")
-            return JSONResponse({"status": "ok"})
+        if DELIVERY_MANAGER is None:
+            send_whatsapp_text(user_number, "Delivery no disponible.")
+            USERS.set_state(user_number, "browsing")
+            return
+
+        # Encolarlo en delivery
+        try:
+            enqueued_order = await delivery_call("enqueue_order", order)
+            if enqueued_order is not order:
+                # vía IPC vuelve una copia: código, zona y ETA asignados allá
+                order.merge(enqueued_order)
+        except Exception as e:
+            print("❌ ERROR enqueue_order:", e)
+            send_whatsapp_text(user_number, "Error al procesar tu pedido.")
+            USERS.set_state(user_number, "browsing")
+            return
 
-        send_whatsapp_text(user_number, "Escribe *menu* para comenzar.")
-        return JSONResponse({"status": "ok"})
+        # -----------------------------
+        # 🔥 RESPUESTA COMPLETA AL CLIENTE
+        # -----------------------------
+        dist = enqueued_order.distance_km
+        eta = enqueued_order.eta_min
 
-    except Exception as e:
-        print("❌ ERROR EN WEBHOOK:", e)
-        return JSONResponse({"status": "ok"})
+        msg_txt = (
+            f"✅ Pedido recibido.\n"
+            f"Tu código de entrega es *{enqueued_order.code}*."
+        )
+
+        if dist:
+            msg_txt += f"\n📏 Distancia estimada: *{dist} km*."
+        if eta:
+            msg_txt += f"\n⏱️ Tiempo estimado de entrega: *{eta} minutos*."
+
+        send_whatsapp_text(user_number, msg_txt)
+
+        USERS.set_state(user_number, "browsing")
+        return
+
+    # ========= TEXTO =========
+    if msg.get("type") == "text":
+        text = msg["text"]["body"].strip().lower()
+
+        # —— Confirmación delivery —— 
+        if is_courier_confirmation(text):
+            parts = text.split()
+            code = parts[1] if text.startswith("entrego ") else text.upper()
+            delivery_id = user_number
+            ok = await delivery_call("verify_and_mark_delivered", delivery_id, code) if DELIVERY_MANAGER else False
+            send_whatsapp_text(
+                user_number,
+                "Código verificado ✔️" if ok else "Código inválido ❌"
+            )
+            return
+
+        # —— Nota en carrito ——
+        if user.state == "adding_note":
+            save_cart_line(user_number, "" if text == "no" else text)
+            return
+
+        # —— Comandos base ——
+        if text in MENU_COMMANDS:
+            USERS.reset_catalog_flow(user_number)
+            send_whatsapp_buttons(
+                user_number,
+                header="Menú principal",
+                body="Selecciona una opción:",
+                buttons=[
+                    {"id": "btn_catalogo", "title": "Ver catálogo"},
+                    {"id": "btn_carrito", "title": "Ver carrito"},
+                    {"id": "btn_info", "title": "Información"},
+                ],
+            )
+            return
+
+        send_whatsapp_text(user_number, "No entendí 🤖. Escribe *menu*.")
+        return
+
+    send_whatsapp_text(user_number, "Escribe *menu* para comenzar.")
+    return
 
 
 # ==========================================================
-# HANDLER LISTAS
+# ROUTERS DE INTERACCIONES (IDs de listas y botones)
 # ==========================================================
+LIST_ROUTER = InteractionRouter("list")
+BUTTON_ROUTER = InteractionRouter("button")
+
+
 def handle_list_reply(user_number: str, row_id: str):
+    LIST_ROUTER.dispatch(row_id, user_number)
+
+
+def handle_button_reply(user_number: str, btn_id: str):
+    BUTTON_ROUTER.dispatch(btn_id.strip().lower(), user_number)
+
+
+# ==========================================================
+# HANDLER LISTAS
+# ==========================================================
+@LIST_ROUTER.route("prod_{prod_id}")
+def on_list_product(user_number: str, prod_id: str):
+    request_quantity(user_number, prod_id)
+
+
+@LIST_ROUTER.route("ctl_filter")
+def on_list_filter(user_number: str):
+    send_filter_menu(user_number)
+
+
+@LIST_ROUTER.route("ctl_sort")
+def on_list_sort(user_number: str):
     user = get_user_obj(user_number)
+    user.sort = "asc" if user.sort is None else ("desc" if user.sort == "asc" else None)
+    user.page = 0
+    send_product_menu(user_number)
 
-    if row_id.startswith("prod_"):
-        prod_id = row_id.replace("prod_", "")
-        request_quantity(user_number, prod_id)
-        return
 
-    if row_id == "ctl_filter":
-        send_filter_menu(user_number)
-        return
+@LIST_ROUTER.route("ctl_next_{page:int}", "ctl_prev_{page:int}")
+def on_list_page(user_number: str, page: int):
+    get_user_obj(user_number).page = page
+    send_product_menu(user_number)
 
-    if row_id == "ctl_sort":
-        user.sort = "asc" if user.sort is None else ("desc" if user.sort == "asc" else None)
-        user.page = 0
-        send_product_menu(user_number)
-        return
 
-    if row_id.startswith("ctl_next_"):
-        user.page = int(row_id.replace("ctl_next_", ""))
-        send_product_menu(user_number)
-        return
+@LIST_ROUTER.route("cat_{category}")
+def on_list_category(user_number: str, category: str):
+    user = get_user_obj(user_number)
+    user.category = category
+    user.page = 0
+    send_product_menu(user_number)
 
-    if row_id.startswith("ctl_prev_"):
-        user.page = int(row_id.replace("ctl_prev_", ""))
-        send_product_menu(user_number)
-        return
 
-    if row_id.startswith("cat_"):
-        user.category = row_id.replace("cat_", "")
-        user.page = 0
-        send_product_menu(user_number)
-        return
+@LIST_ROUTER.route("edit_{index:int}", priority=PRIORITY_CHECKOUT)
+def on_list_edit(user_number: str, index: int):
+    send_edit_actions(user_number, index)
 
-    if row_id.startswith("edit_"):
-        index = int(row_id.replace("edit_", ""))
-        send_edit_actions(user_number, index)
-        return
 
+@LIST_ROUTER.fallback
+def on_list_unknown(user_number: str):
     send_whatsapp_text(user_number, "Opción no reconocida.")
 
 
 # ==========================================================
 # HANDLER BOTONES
 # ==========================================================
-def handle_button_reply(user_number: str, btn_id: str):
-    user = get_user_obj(user_number)
-    btn_id = btn_id.strip().lower()
+@BUTTON_ROUTER.route("btn_catalogo")
+@BUTTON_ROUTER.route("cart_add_more", priority=PRIORITY_CHECKOUT)
+def on_btn_catalog(user_number: str):
+    USERS.reset_catalog_flow(user_number)
+    send_product_menu(user_number)
 
-    if btn_id == "btn_catalogo":
-        USERS.reset_catalog_flow(user_number)
-        send_product_menu(user_number)
-        return
 
-    if btn_id == "btn_carrito":
-        send_cart(user_number)
-        return
+@BUTTON_ROUTER.route("btn_carrito", priority=PRIORITY_CHECKOUT)
+def on_btn_cart(user_number: str):
+    send_cart(user_number)
 
-    if btn_id == "btn_info":
-        send_whatsapp_text(user_number, "ℹ️ Somos una tienda online.")
-        return
 
-    if btn_id.startswith("qty_"):
-        parts = btn_id.split("_")
-        if len(parts) == 3:
-            _, prod_id, qty_s = parts
-            qty = int(qty_s)
-            user.pending_qty = qty
-            USERS.set_state(user_number, "adding_note")
-            ask_for_note(user_number)
-            return
-        send_whatsapp_text(user_number, "Error leyendo cantidad.")
-        return
+@BUTTON_ROUTER.route("btn_info")
+def on_btn_info(user_number: str):
+    send_whatsapp_text(user_number, "ℹ️ Somos una tienda online.")
 
-    if btn_id == "cart_add_more":
-        USERS.reset_catalog_flow(user_number)
-        send_product_menu(user_number)
-        return
 
-    if btn_id == "cart_finish":
-        USERS.set_state(user_number, "awaiting_location")
-        send_whatsapp_text(user_number, "Perfecto. Enviá tu ubicación para confirmar el pedido.")
-        return
+@BUTTON_ROUTER.route("qty_{prod_id}_{qty:int}", priority=PRIORITY_CHECKOUT)
+def on_btn_qty(user_number: str, prod_id: str, qty: int):
+    get_user_obj(user_number).pending_qty = qty
+    USERS.set_state(user_number, "adding_note")
+    ask_for_note(user_number)
 
-    if btn_id == "cart_edit":
-        send_edit_menu(user_number)
-        return
 
-    if btn_id == "cart_clear":
-        CART.clear(user)
-        send_whatsapp_text(user_number, "🗑 Carrito vaciado.")
-        return
+@BUTTON_ROUTER.route("qty_{raw}", priority=PRIORITY_CHECKOUT)
+def on_btn_qty_invalid(user_number: str, raw: str):
+    send_whatsapp_text(user_number, "Error leyendo cantidad.")
 
-    if btn_id.startswith("edit_qty_"):
-        idx = int(btn_id.replace("edit_qty_", ""))
-        item = user.cart[idx]
-        request_quantity(user_number, item["product"]["id"])
-        return
 
-    if btn_id.startswith("edit_rm_"):
-        idx = int(btn_id.replace("edit_rm_", ""))
-        CART.remove(user, idx)
-        send_cart(user_number)
-        return
+@BUTTON_ROUTER.route("cart_finish", priority=PRIORITY_CHECKOUT)
+def on_btn_finish(user_number: str):
+    USERS.set_state(user_number, "awaiting_location")
+    send_whatsapp_text(user_number, "Perfecto. Enviá tu ubicación para confirmar el pedido.")
+
+
+@BUTTON_ROUTER.route("cart_edit", priority=PRIORITY_CHECKOUT)
+def on_btn_edit(user_number: str):
+    send_edit_menu(user_number)
+
+
+@BUTTON_ROUTER.route("cart_clear", priority=PRIORITY_CHECKOUT)
+def on_btn_clear(user_number: str):
+    CART.clear(get_user_obj(user_number))
+    send_whatsapp_text(user_number, "🗑 Carrito vaciado.")
+
+
+@BUTTON_ROUTER.route("edit_qty_{idx:int}", priority=PRIORITY_CHECKOUT)
+def on_btn_edit_qty(user_number: str, idx: int):
+    item = get_user_obj(user_number).cart[idx]
+    request_quantity(user_number, item["product"]["id"])
+
+
+@BUTTON_ROUTER.route("edit_rm_{idx:int}", priority=PRIORITY_CHECKOUT)
+def on_btn_edit_rm(user_number: str, idx: int):
+    CART.remove(get_user_obj(user_number), idx)
+    send_cart(user_number)
+
 
+@BUTTON_ROUTER.fallback
+def on_btn_unknown(user_number: str):
     send_whatsapp_text(user_number, "Botón no reconocido.")
 
 
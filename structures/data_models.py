@@ -1,30 +1,102 @@
 # structures/data_models.py
-from dataclasses import dataclass
+from dataclasses import dataclass, field, fields
 from typing import List, Optional
-from datetime import datetime
 
-@dataclass
+# slots=True: sin __dict__ por instancia (menos memoria, acceso más rápido).
+# to_dict / from_dict arman los dicts a mano: dataclasses.asdict copia en
+# profundidad y es varias veces más lento.
+
+
+@dataclass(slots=True)
 class Product:
     id: int
     name: str
     category: str
     price: float
 
-@dataclass
+
+@dataclass(slots=True)
 class CartItem:
     product_id: int
     qty: int
     details: str
 
-@dataclass
+
+@dataclass(slots=True)
+class OrderItem:
+    """Línea de un pedido ya confirmado (precio congelado al crearlo)."""
+    id: str
+    nombre: str
+    qty: int
+    price: float
+    note: str = ""
+
+    def to_dict(self) -> dict:
+        return {"id": self.id, "nombre": self.nombre, "qty": self.qty,
+                "price": self.price, "note": self.note}
+
+    @classmethod
+    def from_dict(cls, d: dict) -> "OrderItem":
+        return cls(d["id"], d["nombre"], d["qty"], d["price"], d.get("note", ""))
+
+
+@dataclass(slots=True)
 class Order:
+    """
+    Pedido a lo largo de todo el circuito: carrito -> cola de zona -> tanda
+    -> entrega -> archivo. Los campos de delivery quedan en None hasta que
+    cada etapa los completa.
+    """
     id: int
-    phone: str
-    items: List[CartItem]
-    total: float
-    created_at: datetime
-    status: str
+    user: str                      # teléfono del cliente
     code: str
+    items: List[OrderItem] = field(default_factory=list)
+    total: float = 0.0
     lat: Optional[float] = None
     lon: Optional[float] = None
+    created_at: Optional[float] = None
+    status: str = "pending"
+
+    # cola / zona (DeliveryManager.enqueue_order)
     distance_km: Optional[float] = None
+    zone: Optional[str] = None
+    enqueued_at: Optional[float] = None
+    eta_min: Optional[int] = None
+    eta_p90_min: Optional[int] = None
+
+    # tanda / entrega
+    tanda_id: Optional[int] = None
+    leg_km: Optional[float] = None
+    assigned_at: Optional[float] = None
+    delivered_at: Optional[float] = None
+    delivered_by: Optional[str] = None
+
+    def to_dict(self) -> dict:
+        """Formato de cable / almacenamiento (JSON)."""
+        return {
+            "id": self.id, "user": self.user, "code": self.code,
+            "items": [i.to_dict() for i in self.items],
+            "total": self.total, "lat": self.lat, "lon": self.lon,
+            "created_at": self.created_at, "status": self.status,
+            "distance_km": self.distance_km, "zone": self.zone,
+            "enqueued_at": self.enqueued_at,
+            "eta_min": self.eta_min, "eta_p90_min": self.eta_p90_min,
+            "tanda_id": self.tanda_id, "leg_km": self.leg_km,
+            "assigned_at": self.assigned_at, "delivered_at": self.delivered_at,
+            "delivered_by": self.delivered_by,
+        }
+
+    @classmethod
+    def from_dict(cls, d: dict) -> "Order":
+        data = {k: d[k] for k in _ORDER_FIELDS if k in d}
+        data["items"] = [i if isinstance(i, OrderItem) else OrderItem.from_dict(i)
+                         for i in d.get("items") or ()]
+        return cls(**data)
+
+    def merge(self, other: "Order"):
+        """Copia todos los campos de `other` (ej: la copia que vuelve por IPC)."""
+        for name in _ORDER_FIELDS:
+            setattr(self, name, getattr(other, name))
+
+
+_ORDER_FIELDS = tuple(f.name for f in fields(Order))
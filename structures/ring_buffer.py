@@ -0,0 +1,51 @@
+# structures/ring_buffer.py
+from collections import deque
+from typing import Any, Callable, Deque, Dict, Hashable, Iterator, Optional
+
+
+class SpillingRingBuffer:
+    """
+    Buffer circular de tamaño fijo con índice por clave.
+
+    Al llenarse, el elemento más viejo sale por `spill` (ej: al archivo en
+    disco) en vez de perderse. append/get/evicción: O(1), memoria acotada
+    por `maxlen`.
+    """
+
+    def __init__(self, maxlen: int, key_fn: Callable[[Any], Hashable],
+                 spill: Optional[Callable[[Any], None]] = None):
+        self.maxlen = maxlen
+        self.key_fn = key_fn
+        self.spill = spill
+        self._items: Deque[Any] = deque()
+        self._index: Dict[Hashable, Any] = {}
+
+    def append(self, item: Any):
+        if len(self._items) >= self.maxlen:
+            old = self._items.popleft()
+            self._index.pop(self.key_fn(old), None)
+            if self.spill is not None:
+                self.spill(old)
+        self._items.append(item)
+        self._index[self.key_fn(item)] = item
+
+    def get(self, key: Hashable, default=None):
+        return self._index.get(key, default)
+
+    def __contains__(self, key: Hashable):
+        return key in self._index
+
+    def __len__(self):
+        return len(self._items)
+
+    def __iter__(self) -> Iterator[Any]:
+        return iter(self._items)
+
+    def __getitem__(self, i):
+        return self._items[i]
+
+    def drain(self):
+        """Manda todo a `spill` (ej: al apagar) sin vaciar la memoria caliente."""
+        if self.spill is not None:
+            for item in self._items:
+                self.spill(item)
@@ -0,0 +1,163 @@
+# structures/streaming_stats.py
+import math
+from typing import List, Optional
+
+
+class EWMA:
+    """Media móvil exponencial. O(1) por muestra."""
+    __slots__ = ("alpha", "value", "count")
+
+    def __init__(self, alpha: float = 0.1, value: Optional[float] = None, count: int = 0):
+        self.alpha = alpha
+        self.value = value
+        self.count = count
+
+    def update(self, x: float):
+        self.value = x if self.value is None else self.value + self.alpha * (x - self.value)
+        self.count += 1
+
+    def to_dict(self) -> dict:
+        return {"alpha": self.alpha, "value": self.value, "count": self.count}
+
+    @classmethod
+    def from_dict(cls, d: dict) -> "EWMA":
+        return cls(d["alpha"], d["value"], d["count"])
+
+
+class QuantileSketch:
+    """
+    Histograma con buckets logarítmicos (error relativo acotado, ~±5% con
+    growth=1.1). Memoria fija, update O(1), cuantil O(#buckets) = constante.
+    Pensado para latencias/tiempos positivos en [min_value, max_value].
+    """
+    __slots__ = ("min_value", "growth", "counts", "total", "_log_growth")
+
+    def __init__(self, min_value: float = 0.1, max_value: float = 1000.0, growth: float = 1.1,
+                 counts: Optional[List[int]] = None):
+        self.min_value = min_value
+        self.growth = growth
+        self._log_growth = math.log(growth)
+        n = int(math.ceil(math.log(max_value / min_value) / self._log_growth)) + 2
+        self.counts = list(counts) if counts is not None else [0] * n
+        self.total = sum(self.counts)
+
+    def _bucket(self, x: float) -> int:
+        if x <= self.min_value:
+            return 0
+        i = int(math.log(x / self.min_value) / self._log_growth) + 1
+        return min(i, len(self.counts) - 1)
+
+    def _value(self, i: int) -> float:
+        if i == 0:
+            return self.min_value
+        # punto medio geométrico del bucket
+        return self.min_value * self.growth ** (i - 0.5)
+
+    def add(self, x: float):
+        self.counts[self._bucket(x)] += 1
+        self.total += 1
+
+    def quantile(self, q: float) -> Optional[float]:
+        if not self.total:
+            return None
+        target = q * (self.total - 1)
+        seen = 0
+        for i, c in enumerate(self.counts):
+            seen += c
+            if seen > target:
+                return self._value(i)
+        return self._value(len(self.counts) - 1)
+
+    def merge(self, other: "QuantileSketch"):
+        for i, c in enumerate(other.counts):
+            self.counts[i] += c
+        self.total += other.total
+
+    def clear(self):
+        self.counts = [0] * len(self.counts)
+        self.total = 0
+
+    def to_dict(self) -> dict:
+        max_value = self.min_value * self.growth ** (len(self.counts) - 2)
+        return {"min_value": self.min_value, "max_value": max_value,
+                "growth": self.growth, "counts": list(self.counts)}
+
+    @classmethod
+    def from_dict(cls, d: dict) -> "QuantileSketch":
+        return cls(d["min_value"], d["max_value"], d["growth"], d["counts"])
+
+
+class RollingWindow:
+    """
+    Ventana deslizante de `span_s` segundos partida en `buckets` baldes de
+    tiempo. Cada balde guarda sumas de `fields` y un QuantileSketch por cada
+    campo de `sketch_fields` (creado recién al llegar la primera muestra).
+
+    add(): O(1) (un balde viejo se recicla en el lugar). summary(): O(buckets),
+    constante. La ventana efectiva cubre entre span - span/buckets y span.
+    """
+    __slots__ = ("span_s", "width", "fields", "sketch_fields",
+                 "_epochs", "_sums", "_sketches")
+
+    def __init__(self, span_s: float, buckets: int = 12,
+                 fields: tuple = (), sketch_fields: tuple = ()):
+        self.span_s = span_s
+        self.width = span_s / buckets
+        self.fields = fields
+        self.sketch_fields = sketch_fields
+        self._epochs: List[int] = [-1] * buckets
+        self._sums: List[List[float]] = [[0.0] * len(fields) for _ in range(buckets)]
+        self._sketches: List[List[Optional[QuantileSketch]]] = [
+            [None] * len(sketch_fields) for _ in range(buckets)
+        ]
+
+    def _slot(self, ts: float) -> int:
+        epoch = int(ts // self.width)
+        i = epoch % len(self._epochs)
+        if self._epochs[i] != epoch:
+            # balde de una vuelta anterior: se recicla
+            self._epochs[i] = epoch
+            self._sums[i] = [0.0] * len(self.fields)
+            self._sketches[i] = [None] * len(self.sketch_fields)
+        return i
+
+    def add(self, ts: float, values: dict, samples: Optional[dict] = None):
+        i = self._slot(ts)
+        sums = self._sums[i]
+        for k, field in enumerate(self.fields):
+            sums[k] += values.get(field, 0.0)
+        for k, field in enumerate(self.sketch_fields):
+            x = (samples or {}).get(field)
+            if x is None:
+                continue
+            sketch = self._sketches[i][k]
+            if sketch is None:
+                sketch = self._sketches[i][k] = QuantileSketch(min_value=0.05, max_value=600.0)
+            sketch.add(x)
+
+    def summary(self, now: float) -> dict:
+        current = int(now // self.width)
+        n = len(self._epochs)
+        totals = [0.0] * len(self.fields)
+        merged = [None] * len(self.sketch_fields)
+        for i, epoch in enumerate(self._epochs):
+            if epoch < 0 or current - epoch >= n or epoch > current:
+                continue
+            for k, v in enumerate(self._sums[i]):
+                totals[k] += v
+            for k, sketch in enumerate(self._sketches[i]):
+                if sketch is None:
+                    continue
+                if merged[k] is None:
+                    merged[k] = QuantileSketch(min_value=0.05, max_value=600.0)
+                merged[k].merge(sketch)
+
+        out = {field: round(totals[k], 3) for k, field in enumerate(self.fields)}
+        for k, field in enumerate(self.sketch_fields):
+            sketch = merged[k]
+            out[field] = {
+                "count": sketch.total if sketch else 0,
+                "p50": round(sketch.quantile(0.5), 2) if sketch else None,
+                "p90": round(sketch.quantile(0.9), 2) if sketch else None,
+            }
+        return out
@@ -1,12 +1,16 @@
 # structures/trees_and_queues.py
+import itertools
 import time
-from typing import Any, List, Optional, Callable
+from collections import deque
+from typing import Any, Callable, Deque, Dict, Iterator, List, Optional, Tuple
+
+from structures.data_models import Order
 
 
 class BSTNode:
     def __init__(self, key: float, value: Any):
         self.key = key  # por ejemplo: distancia
-        self.value = value  # pedido (order dict)
+        self.value = value  # pedido (Order)
         self.left: Optional['BSTNode'] = None
         self.right: Optional['BSTNode'] = None
 
@@ -31,55 +35,289 @@ class BSTree:
         """
         Construye un BST balanceado según el enunciado: raíz = pedido mediano por distancia.
         Strategy: ordeno por key_fn, tomo mediana como root recursivamente (divide & conquer).
+        Se trabaja con índices [lo, hi) sobre la lista ordenada: sin copiar sublistas.
+        Para inserciones/bajas incrementales usar AVLTree.
         """
-        def build(sorted_items: List[dict]) -> Optional[BSTNode]:
-            if not sorted_items:
+        def build(lo: int, hi: int) -> Optional[BSTNode]:
+            if lo >= hi:
                 return None
-            mid = len(sorted_items) // 2
-            node = BSTNode(key=key_fn(sorted_items[mid]), value=sorted_items[mid])
-            node.left = build(sorted_items[:mid])
-            node.right = build(sorted_items[mid+1:])
+            mid = (lo + hi) // 2
+            node = BSTNode(key=key_fn(sorted_orders[mid]), value=sorted_orders[mid])
+            node.left = build(lo, mid)
+            node.right = build(mid + 1, hi)
             return node
 
         sorted_orders = sorted(orders, key=key_fn)
-        self.root = build(sorted_orders)
+        self.root = build(0, len(sorted_orders))
 
     def inorder(self):
         """Devuelve lista inorder (de más cercano a más lejano si key=distancia)."""
         res = []
-        def _in(node: Optional[BSTNode]):
-            if not node:
-                return
-            _in(node.left)
+        stack: List[BSTNode] = []
+        node = self.root
+        while stack or node:
+            while node:
+                stack.append(node)
+                node = node.left
+            node = stack.pop()
             res.append(node.value)
-            _in(node.right)
-        _in(self.root)
+            node = node.right
         return res
 
 
+# ------------------------
+# Árbol AVL (balanceado, incremental)
+# ------------------------
+class AVLNode:
+    __slots__ = ("key", "value", "left", "right", "height")
+
+    def __init__(self, key, value):
+        self.key = key
+        self.value = value
+        self.left: Optional['AVLNode'] = None
+        self.right: Optional['AVLNode'] = None
+        self.height = 1
+
+
+def _h(node: Optional[AVLNode]) -> int:
+    return node.height if node else 0
+
+
+def _fix(node: AVLNode):
+    node.height = 1 + max(_h(node.left), _h(node.right))
+
+
+def _rotate_right(y: AVLNode) -> AVLNode:
+    x = y.left
+    y.left = x.right
+    x.right = y
+    _fix(y)
+    _fix(x)
+    return x
+
+
+def _rotate_left(x: AVLNode) -> AVLNode:
+    y = x.right
+    x.right = y.left
+    y.left = x
+    _fix(x)
+    _fix(y)
+    return y
+
+
+def _rebalance(node: AVLNode) -> AVLNode:
+    _fix(node)
+    balance = _h(node.left) - _h(node.right)
+    if balance > 1:
+        if _h(node.left.left) < _h(node.left.right):
+            node.left = _rotate_left(node.left)
+        return _rotate_right(node)
+    if balance < -1:
+        if _h(node.right.right) < _h(node.right.left):
+            node.right = _rotate_right(node.right)
+        return _rotate_left(node)
+    return node
+
+
+class AVLTree:
+    """
+    Árbol AVL por clave (ej: (distancia, secuencia)). Se mantiene
+    balanceado en cada operación, sin reconstruir:
+      insert / remove / min: O(log n)
+      range / smallest(k):   O(log n + k)
+    Las claves deben ser únicas.
+    """
+
+    def __init__(self):
+        self.root: Optional[AVLNode] = None
+        self._size = 0
+
+    def __len__(self):
+        return self._size
+
+    def insert(self, key, value):
+        def _ins(node: Optional[AVLNode]) -> AVLNode:
+            if node is None:
+                return AVLNode(key, value)
+            if key < node.key:
+                node.left = _ins(node.left)
+            elif key > node.key:
+                node.right = _ins(node.right)
+            else:
+                raise KeyError(f"Clave duplicada: {key!r}")
+            return _rebalance(node)
+
+        self.root = _ins(self.root)
+        self._size += 1
+
+    def remove(self, key) -> bool:
+        removed = False
+
+        def _del(node: Optional[AVLNode], key) -> Optional[AVLNode]:
+            nonlocal removed
+            if node is None:
+                return None
+            if key < node.key:
+                node.left = _del(node.left, key)
+            elif key > node.key:
+                node.right = _del(node.right, key)
+            else:
+                removed = True
+                if node.left is None:
+                    return node.right
+                if node.right is None:
+                    return node.left
+                # sucesor: el mínimo del subárbol derecho
+                succ = node.right
+                while succ.left:
+                    succ = succ.left
+                node.key, node.value = succ.key, succ.value
+                node.right = _del(node.right, succ.key)
+            return _rebalance(node)
+
+        self.root = _del(self.root, key)
+        if removed:
+            self._size -= 1
+        return removed
+
+    def get(self, key, default=None):
+        node = self.root
+        while node:
+            if key < node.key:
+                node = node.left
+            elif key > node.key:
+                node = node.right
+            else:
+                return node.value
+        return default
+
+    def min(self) -> Optional[Tuple[Any, Any]]:
+        node = self.root
+        if node is None:
+            return None
+        while node.left:
+            node = node.left
+        return node.key, node.value
+
+    def range(self, lo, hi) -> Iterator[Tuple[Any, Any]]:
+        """(clave, valor) con lo <= clave <= hi, en orden."""
+        stack: List[AVLNode] = []
+        node = self.root
+        while stack or node:
+            if node:
+                if node.key < lo:
+                    node = node.right
+                    continue
+                stack.append(node)
+                node = node.left
+                continue
+            node = stack.pop()
+            if node.key > hi:
+                return
+            yield node.key, node.value
+            node = node.right
+
+    def smallest(self, k: int) -> List[Any]:
+        """Los k valores de menor clave."""
+        out = []
+        for _, value in self.items():
+            if len(out) >= k:
+                break
+            out.append(value)
+        return out
+
+    def items(self) -> Iterator[Tuple[Any, Any]]:
+        """Recorrido inorder iterativo (sin recursión ni copias)."""
+        stack: List[AVLNode] = []
+        node = self.root
+        while stack or node:
+            while node:
+                stack.append(node)
+                node = node.left
+            node = stack.pop()
+            yield node.key, node.value
+            node = node.right
+
+    def values(self) -> List[Any]:
+        return [v for _, v in self.items()]
+
+
 class ZoneQueue:
     """
     Cola FIFO por zona. Mantiene timestamps para el primer pedido (para el criterio 45 minutos).
+
+    Además indexa los pedidos pendientes por distancia en un AVLTree, así
+    puede responder "los k más cercanos" o un rango de distancias, y
+    cancelar un pedido en O(log n) sin reconstruir nada. Los cancelados
+    quedan en la FIFO y se saltean al sacar (borrado perezoso).
+
+    Cada entrada se identifica por una secuencia propia, no por el id del
+    pedido: si llegaran dos pedidos con el mismo id, ninguno queda oculto.
     """
-    def __init__(self, name: str):
+    def __init__(self, name: str, key_fn: Callable[[Order], float] = lambda o: o.distance_km or 0.0):
         self.name = name
-        self._queue: List[dict] = []
+        self.key_fn = key_fn
+        self._queue: Deque[Tuple[int, Order]] = deque()   # (secuencia, pedido)
+        self._keys: Dict[int, Tuple[float, int]] = {}      # secuencia -> clave en el árbol
+        self._seq_by_id: Dict[Any, int] = {}               # id pedido -> secuencia (para cancel)
+        self._by_distance = AVLTree()
+        self._seq = itertools.count()
 
-    def enqueue(self, order: dict):
-        order["_enqueued_at"] = time.time()
-        self._queue.append(order)
+    def _discard_dead_head(self):
+        while self._queue and self._queue[0][0] not in self._keys:
+            self._queue.popleft()
 
-    def peek(self) -> Optional[dict]:
-        return self._queue[0] if self._queue else None
+    def enqueue(self, order: Order, now: Optional[float] = None):
+        if order.enqueued_at is None:
+            order.enqueued_at = time.time() if now is None else now
+        seq = next(self._seq)
+        key = (self.key_fn(order), seq)
+        self._keys[seq] = key
+        self._seq_by_id[order.id] = seq
+        self._by_distance.insert(key, order)
+        self._queue.append((seq, order))
 
-    def dequeue_batch(self, n: int) -> List[dict]:
-        """Saca hasta n pedidos y los devuelve."""
-        batch = self._queue[:n]
-        self._queue = self._queue[n:]
+    def peek(self) -> Optional[Order]:
+        self._discard_dead_head()
+        return self._queue[0][1] if self._queue else None
+
+    def dequeue_batch(self, n: int) -> List[Order]:
+        """Saca hasta n pedidos (los más viejos) y los devuelve. O(n log N)."""
+        batch = []
+        while self._queue and len(batch) < n:
+            seq, order = self._queue.popleft()
+            key = self._keys.pop(seq, None)
+            if key is None:
+                continue  # cancelado
+            if self._seq_by_id.get(order.id) == seq:
+                del self._seq_by_id[order.id]
+            self._by_distance.remove(key)
+            batch.append(order)
         return batch
 
+    def cancel(self, order_id) -> Optional[Order]:
+        """Quita un pedido pendiente por id. O(log n)."""
+        seq = self._seq_by_id.pop(order_id, None)
+        key = self._keys.pop(seq, None) if seq is not None else None
+        if key is None:
+            return None
+        order = self._by_distance.get(key)
+        self._by_distance.remove(key)
+        return order
+
+    def nearest(self, k: int) -> List[Order]:
+        """Los k pedidos pendientes más cercanos."""
+        return self._by_distance.smallest(k)
+
+    def within(self, min_km: float, max_km: float) -> List[Order]:
+        """Pendientes con distancia en [min_km, max_km], de menor a mayor."""
+        return [o for _, o in self._by_distance.range((min_km, -1), (max_km, float("inf")))]
+
     def size(self) -> int:
-        return len(self._queue)
+        return len(self._keys)
+
+    def __len__(self):
+        return len(self._keys)
 
-    def all(self) -> List[dict]:
-        return list(self._queue)
+    def all(self) -> List[Order]:
+        return [o for seq, o in self._queue if seq in self._keys]
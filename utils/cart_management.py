@@ -1,22 +1,14 @@
 # utils/cart_management.py
 
+import os
 import random
 import time
-from math import radians, sin, cos, sqrt, atan2
 
-# =========================================
-# DISTANCIA GEO
-# =========================================
-
-def haversine_km(lat1, lon1, lat2, lon2):
-    R = 6371.0
-    rlat1, rlon1, rlat2, rlon2 = map(radians, [lat1, lon1, lat2, lon2])
-    dlat = rlat2 - rlat1
-    dlon = rlon2 - rlon1
-    a = sin(dlat/2)**2 + cos(rlat1)*cos(rlat2)*sin(dlon/2)**2
-    c = 2 * atan2(sqrt(a), sqrt(1-a))
-    return R * c
+from structures.data_models import Order, OrderItem
+from structures.ring_buffer import SpillingRingBuffer
 
+# pedidos que quedan en memoria; los más viejos pasan al archivo en disco
+ORDERS_HOT_MAX = int(os.getenv("ORDERS_HOT_MAX", 1000))
 
 # =========================================
 # NUEVO CART MANAGER
@@ -24,8 +16,41 @@ def haversine_km(lat1, lon1, lat2, lon2):
 
 class CartManager:
 
-    def __init__(self):
-        self.orders = []  # historial de órdenes
+    def __init__(self, archive=None, hot_max: int = ORDERS_HOT_MAX,
+                 id_offset: int = 0, id_step: int = 1):
+        self.archive = archive
+        # historial de órdenes: solo las recientes en memoria
+        self.orders = SpillingRingBuffer(
+            hot_max, key_fn=lambda o: o.id,
+            spill=self._archive_order if archive else None
+        )
+        # los ids siguen después de lo archivado (no se repiten al reiniciar).
+        # Con varios workers cada uno usa su propia clase de resto:
+        # id ≡ id_offset + 1 (mód id_step)
+        self._id_offset = id_offset
+        self._id_step = id_step
+        self._next_order_id = 0
+        self.reserve_ids_through(archive.max_record_id("order") if archive else 0)
+
+    def reserve_ids_through(self, max_id: int):
+        """
+        Los próximos ids quedan por encima de max_id. Tras un crash el
+        archivo no tiene los pedidos que seguían en memoria: main.py llama
+        esto también con el mayor id que recuperó el DeliveryManager.
+        """
+        next_id = max_id + 1
+        next_id += (self._id_offset - (next_id - 1)) % self._id_step
+        self._next_order_id = max(self._next_order_id, next_id)
+
+    def _archive_order(self, order: Order):
+        self.archive.append("order", order.to_dict(), phone=order.user)
+
+    def get_order(self, order_id) -> Order | None:
+        order = self.orders.get(order_id)
+        if order is None and self.archive:
+            data = self.archive.get("order", order_id)
+            order = Order.from_dict(data) if data else None
+        return order
 
     # ----------------------------------------------------------
     # AGREGAR PRODUCTO
@@ -96,7 +121,8 @@ class CartManager:
         if not user.cart:
             return None
 
-        order_id = len(self.orders) + 1
+        order_id = self._next_order_id
+        self._next_order_id += self._id_step
         code = "".join(random.choices("ABCDEFGHJKLMNPQRSTUVWXYZ23456789", k=6))
 
         items = []
@@ -107,31 +133,20 @@ class CartManager:
             qty = item["qty"]
             price = float(prod["precio"])
 
-            items.append({
-                "id": prod["id"],
-                "nombre": prod["nombre"],
-                "qty": qty,
-                "price": price,
-                "note": item["note"]
-            })
+            items.append(OrderItem(prod["id"], prod["nombre"], qty, price, item["note"]))
 
             total += qty * price
 
-        # -------------- FIX MÁS IMPORTANTE -------------------
-        # user.phone NO EXISTE → debe ser user.number
-        # -----------------------------------------------------
-
-        order = {
-            "id": order_id,
-            "code": code,
-            "user": user.number,     # ✔ FIX CORRECTO
-            "items": items,
-            "total": round(total, 2),
-            "lat": lat,
-            "lon": lon,
-            "created_at": time.time(),
-            "status": "pending"
-        }
+        order = Order(
+            id=order_id,
+            user=user.number,
+            code=code,
+            items=items,
+            total=round(total, 2),
+            lat=lat,
+            lon=lon,
+            created_at=time.time(),
+        )
 
         self.orders.append(order)
         user.cart.clear()  # vaciar carrito
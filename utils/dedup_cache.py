@@ -0,0 +1,58 @@
+# utils/dedup_cache.py
+import time
+from collections import OrderedDict
+from typing import Callable, Hashable
+
+
+class DedupCache:
+    """
+    IDs de mensajes ya procesados, acotado por TTL y por tamaño (LRU).
+
+    Meta reintenta el webhook si tardamos: con esto un reintento se corta
+    antes de llegar a cualquier handler. Como el TTL es fijo, el orden de
+    inserción es también el orden de vencimiento, así que purgar es sacar
+    del frente. Memoria constante: nunca más de `maxsize` entradas.
+    """
+
+    def __init__(self, ttl_seconds: float = 3600, maxsize: int = 100_000,
+                 clock: Callable[[], float] = time.monotonic):
+        self.ttl = ttl_seconds
+        self.maxsize = maxsize
+        self.clock = clock
+        self._seen: "OrderedDict[Hashable, float]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def _purge(self, now: float):
+        while self._seen:
+            key, expires_at = next(iter(self._seen.items()))
+            if expires_at > now:
+                break
+            self._seen.popitem(last=False)
+
+    def check_and_add(self, key: Hashable) -> bool:
+        """True si `key` ya se vio (duplicado); si no, lo registra."""
+        now = self.clock()
+        self._purge(now)
+
+        if key in self._seen:
+            self.hits += 1
+            return True
+
+        self.misses += 1
+        self._seen[key] = now + self.ttl
+        if len(self._seen) > self.maxsize:
+            self._seen.popitem(last=False)
+        return False
+
+    def __len__(self):
+        return len(self._seen)
+
+    def stats(self) -> dict:
+        return {
+            "size": len(self._seen),
+            "maxsize": self.maxsize,
+            "ttl_seconds": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
@@ -1,12 +1,21 @@
 # utils/geo_calculator.py
 from math import radians, sin, cos, sqrt, atan2
 
+import numpy as np
+
+EARTH_RADIUS_KM = 6371.0
+
+# "haversine": exacta sobre la esfera
+# "equirect": aproximación equirectangular, suficiente a escala ciudad (< 0.1% a 20 km)
+MODES = ("haversine", "equirect")
+
+
 def haversine_km(lat1, lon1, lat2, lon2):
     """
     Calcula la distancia entre dos puntos geográficos usando la fórmula Haversine.
     Devuelve la distancia en kilómetros (float).
     """
-    R = 6371.0  # radio de la Tierra en km
+    R = EARTH_RADIUS_KM  # radio de la Tierra en km
 
     lat1_r = radians(lat1)
     lon1_r = radians(lon1)
@@ -23,3 +32,57 @@ def haversine_km(lat1, lon1, lat2, lon2):
     c = 2 * atan2(sqrt(a), sqrt(1 - a))
 
     return R * c
+
+
+def equirectangular_km(lat1, lon1, lat2, lon2):
+    """Aproximación plana (equirectangular) de la distancia en km."""
+    lat1_r = radians(lat1)
+    lat2_r = radians(lat2)
+    x = radians(lon2 - lon1) * cos((lat1_r + lat2_r) / 2)
+    y = lat2_r - lat1_r
+    return EARTH_RADIUS_KM * sqrt(x * x + y * y)
+
+
+def distance_km(lat1, lon1, lat2, lon2, mode: str = "haversine"):
+    """Distancia escalar en el modo pedido."""
+    if mode == "equirect":
+        return equirectangular_km(lat1, lon1, lat2, lon2)
+    return haversine_km(lat1, lon1, lat2, lon2)
+
+
+# ==========================================
+# VERSIONES VECTORIZADAS (NumPy)
+# ==========================================
+def _vec_km(lat1, lon1, lat2, lon2, mode: str):
+    """Núcleo vectorizado; los argumentos (en radianes) se combinan por broadcasting."""
+    if mode == "equirect":
+        x = (lon2 - lon1) * np.cos((lat1 + lat2) / 2)
+        y = lat2 - lat1
+        return EARTH_RADIUS_KM * np.sqrt(x * x + y * y)
+
+    a = (
+        np.sin((lat2 - lat1) / 2) ** 2 +
+        np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+def distances_from(lat, lon, lats, lons, mode: str = "haversine") -> np.ndarray:
+    """Uno-a-muchos: distancia desde (lat, lon) a cada punto. Devuelve array (n,)."""
+    lats_r = np.radians(np.asarray(lats, dtype=np.float64))
+    lons_r = np.radians(np.asarray(lons, dtype=np.float64))
+    return _vec_km(radians(lat), radians(lon), lats_r, lons_r, mode)
+
+
+def distances_between(lats_a, lons_a, lats_b, lons_b, mode: str = "haversine") -> np.ndarray:
+    """Muchos-a-muchos: matriz (len(a), len(b)) de distancias."""
+    la = np.radians(np.asarray(lats_a, dtype=np.float64))[:, None]
+    oa = np.radians(np.asarray(lons_a, dtype=np.float64))[:, None]
+    lb = np.radians(np.asarray(lats_b, dtype=np.float64))[None, :]
+    ob = np.radians(np.asarray(lons_b, dtype=np.float64))[None, :]
+    return _vec_km(la, oa, lb, ob, mode)
+
+
+def distance_matrix(lats, lons, mode: str = "haversine") -> np.ndarray:
+    """Matriz simétrica (n, n) entre todos los puntos de una lista."""
+    return distances_between(lats, lons, lats, lons, mode)
@@ -16,3 +16,12 @@ def get_message_type(message):
             return "list", interactive["list_reply"]["id"]
 
     return "unknown", None
+
+
+def iter_webhook_messages(body):
+    """Recorre TODOS los mensajes de un webhook (entries → changes → messages)."""
+    for entry in body.get("entry") or []:
+        for change in entry.get("changes") or []:
+            value = change.get("value") or {}
+            for message in value.get("messages") or []:
+                yield message
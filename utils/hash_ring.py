@@ -0,0 +1,50 @@
+# utils/hash_ring.py
+import bisect
+import hashlib
+from typing import Dict, Iterable, List, Tuple
+
+
+def _hash(key: str) -> int:
+    return int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), "big")
+
+
+class ConsistentHashRing:
+    """
+    Hash consistente con nodos virtuales.
+
+    node_for(key): O(log(n * vnodes)) con bisect. Agregar o quitar un nodo
+    solo mueve ~1/n de las claves (las conversaciones del resto de los
+    workers no cambian de dueño).
+    """
+
+    def __init__(self, nodes: Iterable[str] = (), vnodes: int = 100):
+        self.vnodes = vnodes
+        self._keys: List[int] = []
+        self._ring: Dict[int, str] = {}
+        for node in nodes:
+            self.add(node)
+
+    def add(self, node: str):
+        for i in range(self.vnodes):
+            h = _hash(f"{node}#{i}")
+            if h in self._ring:
+                continue
+            self._ring[h] = node
+            bisect.insort(self._keys, h)
+
+    def remove(self, node: str):
+        for i in range(self.vnodes):
+            h = _hash(f"{node}#{i}")
+            if self._ring.get(h) == node:
+                del self._ring[h]
+                self._keys.pop(bisect.bisect_left(self._keys, h))
+
+    def node_for(self, key: str) -> str:
+        if not self._keys:
+            raise LookupError("anillo vacío")
+        i = bisect.bisect(self._keys, _hash(key)) % len(self._keys)
+        return self._ring[self._keys[i]]
+
+    @property
+    def nodes(self) -> Tuple[str, ...]:
+        return tuple(sorted(set(self._ring.values())))
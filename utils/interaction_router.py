@@ -0,0 +1,145 @@
+# utils/interaction_router.py
+import re
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# conversores de parámetros: {nombre:tipo}
+CONVERTERS = {
+    "str": (r".+?", str),
+    "int": (r"-?\d+", int),
+}
+
+_PARAM_RE = re.compile(r"\{(\w+)(?::(\w+))?\}")
+
+
+class _Route:
+    __slots__ = ("pattern", "regex", "casts", "handler", "priority")
+
+    def __init__(self, pattern: str, handler: Callable, priority: Optional[int] = None):
+        self.pattern = pattern
+        self.handler = handler
+        self.priority = priority
+        self.casts: Dict[str, Callable] = {}
+
+        parts = []
+        pos = 0
+        for m in _PARAM_RE.finditer(pattern):
+            name, kind = m.group(1), m.group(2) or "str"
+            if kind not in CONVERTERS:
+                raise ValueError(f"Tipo de parámetro desconocido: {kind} en {pattern}")
+            regex, cast = CONVERTERS[kind]
+            parts.append(re.escape(pattern[pos:m.start()]))
+            parts.append(f"(?P<{name}>{regex})")
+            self.casts[name] = cast
+            pos = m.end()
+        parts.append(re.escape(pattern[pos:]))
+        self.regex = re.compile("".join(parts))
+
+    def match(self, key: str) -> Optional[Dict[str, Any]]:
+        m = self.regex.fullmatch(key)
+        if not m:
+            return None
+        return {k: self.casts[k](v) for k, v in m.groupdict().items()}
+
+
+class _TrieNode:
+    __slots__ = ("children", "routes")
+
+    def __init__(self):
+        self.children: Dict[str, "_TrieNode"] = {}
+        self.routes: List[_Route] = []
+
+
+class InteractionRouter:
+    """
+    Router de IDs de listas/botones, compilado al registrar:
+
+      - IDs fijos ("btn_catalogo")     -> dict, O(1)
+      - IDs con parámetros ("qty_{prod_id}_{qty:int}") -> trie por el
+        prefijo literal; se recorre el ID una vez y se prueban solo las
+        rutas cuyos prefijos coinciden (primero el más largo).
+
+    El costo de despachar depende del largo del ID, no de cuántas
+    acciones haya registradas.
+
+    Cada ruta puede llevar una prioridad (la de descarte bajo carga del
+    webhook); priority_of() la resuelve con las mismas tablas.
+    """
+
+    def __init__(self, name: str = ""):
+        self.name = name
+        self._exact: Dict[str, Tuple[Callable, Optional[int]]] = {}
+        self._root = _TrieNode()
+        self._fallback: Optional[Callable] = None
+
+    # ------------------------
+    # Registro
+    # ------------------------
+    def add(self, pattern: str, handler: Callable, priority: Optional[int] = None):
+        brace = pattern.find("{")
+        if brace == -1:
+            self._exact[pattern] = (handler, priority)
+            return handler
+
+        node = self._root
+        for ch in pattern[:brace]:
+            node = node.children.setdefault(ch, _TrieNode())
+        node.routes.append(_Route(pattern, handler, priority))
+        return handler
+
+    def route(self, *patterns: str, priority: Optional[int] = None):
+        """Decorador: @router.route("edit_rm_{idx:int}", priority=1)"""
+        def deco(fn):
+            for p in patterns:
+                self.add(p, fn, priority)
+            return fn
+        return deco
+
+    def fallback(self, fn: Callable):
+        """Decorador para lo que no coincide con ninguna ruta."""
+        self._fallback = fn
+        return fn
+
+    # ------------------------
+    # Despacho
+    # ------------------------
+    def _match(self, key: str) -> Tuple[Optional[Callable], Dict[str, Any], Optional[int]]:
+        exact = self._exact.get(key)
+        if exact is not None:
+            return exact[0], {}, exact[1]
+
+        # nodos del trie a lo largo del ID que tienen rutas
+        candidates = []
+        node = self._root
+        for ch in key:
+            node = node.children.get(ch)
+            if node is None:
+                break
+            if node.routes:
+                candidates.append(node)
+
+        for node in reversed(candidates):
+            for r in node.routes:
+                params = r.match(key)
+                if params is not None:
+                    return r.handler, params, r.priority
+
+        return None, {}, None
+
+    def resolve(self, key: str) -> Tuple[Optional[Callable], Dict[str, Any]]:
+        handler, params, _ = self._match(key)
+        return handler, params
+
+    def priority_of(self, key: str, default: int) -> int:
+        """Prioridad de la ruta que atendería `key` (default si no tiene o no hay ruta)."""
+        _, _, priority = self._match(key)
+        return default if priority is None else priority
+
+    def dispatch(self, key: str, *args) -> bool:
+        """Ejecuta el handler; devuelve False si no hubo ruta (ni fallback)."""
+        handler, params = self.resolve(key)
+        if handler is not None:
+            handler(*args, **params)
+            return True
+        if self._fallback is not None:
+            self._fallback(*args)
+        return False
@@ -0,0 +1,33 @@
+# utils/keyed_locks.py
+import asyncio
+from contextlib import asynccontextmanager
+from typing import Dict, Hashable, List
+
+
+class KeyedLocks:
+    """
+    Un asyncio.Lock por clave (ej: número de teléfono), creado a demanda y
+    liberado cuando nadie lo usa, así el dict no crece con cada usuario.
+    asyncio.Lock despierta a los que esperan en orden FIFO, por lo que los
+    eventos de una misma clave se procesan en orden de llegada.
+    """
+
+    def __init__(self):
+        self._locks: Dict[Hashable, List] = {}  # key -> [lock, refcount]
+
+    @asynccontextmanager
+    async def lock(self, key: Hashable):
+        slot = self._locks.get(key)
+        if slot is None:
+            slot = self._locks[key] = [asyncio.Lock(), 0]
+        slot[1] += 1
+        try:
+            async with slot[0]:
+                yield
+        finally:
+            slot[1] -= 1
+            if slot[1] == 0:
+                del self._locks[key]
+
+    def __len__(self):
+        return len(self._locks)
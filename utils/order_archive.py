@@ -0,0 +1,197 @@
+# utils/order_archive.py
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS records (
+    kind      TEXT NOT NULL,
+    record_id TEXT NOT NULL,
+    phone     TEXT,
+    day       TEXT,
+    ts        REAL,
+    data      TEXT NOT NULL,
+    num       INTEGER,
+    PRIMARY KEY (kind, record_id)
+);
+CREATE INDEX IF NOT EXISTS idx_records_phone ON records (phone, ts);
+CREATE INDEX IF NOT EXISTS idx_records_day ON records (kind, day);
+"""
+
+# `num`: el id como entero (NULL si no es numérico), para MAX(num) por índice
+NUM_INDEX = """
+CREATE INDEX IF NOT EXISTS idx_records_num ON records (kind, num);
+"""
+
+
+def _day(ts: Optional[float]) -> Optional[str]:
+    return time.strftime("%Y-%m-%d", time.localtime(ts)) if ts else None
+
+
+def _num(record_id: str) -> Optional[int]:
+    return int(record_id) if record_id.isdigit() else None
+
+
+class OrderArchive:
+    """
+    Historial frío de pedidos y tandas en SQLite (append-only salvo upsert
+    por id: un pedido archivado pendiente se reemplaza al archivarse
+    entregado). Índices por id, teléfono y día.
+
+    `append` solo bufferea en memoria; `flush` escribe el lote en una sola
+    transacción y se llama desde un task periódico fuera del event loop
+    (o en línea si el buffer pasa `max_buffer`). `flush` solo toma `_lock`
+    para cambiar de buffer: la transacción corre bajo `_db_lock`, así un
+    `append` del event loop nunca espera a SQLite.
+    """
+
+    def __init__(self, path: str, max_buffer: int = 5000):
+        self.path = path
+        self.max_buffer = max_buffer
+        self._buffer: Dict[Tuple[str, str], Tuple] = {}
+        # lote que se está escribiendo (sigue visible para get())
+        self._writing: Dict[Tuple[str, str], Tuple] = {}
+        self._lock = threading.Lock()
+        self._db_lock = threading.Lock()
+        # timeout: en modo cluster varios procesos escriben el mismo archivo
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._conn.executescript(SCHEMA)
+        self._migrate()
+        self._conn.executescript(NUM_INDEX)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self.written = 0
+
+    def _migrate(self):
+        """Archivos anteriores a la columna `num`: se agrega y se completa una vez."""
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(records)")}
+        if "num" in columns:
+            return
+        try:
+            with self._conn:
+                self._conn.execute("ALTER TABLE records ADD COLUMN num INTEGER")
+                self._conn.execute(
+                    "UPDATE records SET num = CAST(record_id AS INTEGER) "
+                    "WHERE record_id <> '' AND record_id NOT GLOB '*[^0-9]*'"
+                )
+        except sqlite3.OperationalError as e:
+            # en modo cluster otro proceso la agregó primero
+            if "duplicate column" not in str(e):
+                raise
+
+    # ------------------------
+    # Escritura
+    # ------------------------
+    def append(self, kind: str, record: dict, phone: Optional[str] = None,
+               ts: Optional[float] = None):
+        record_id = str(record.get("id"))
+        ts = ts if ts is not None else record.get("created_at")
+        row = (kind, record_id, phone, _day(ts), ts, json.dumps(record, default=str), _num(record_id))
+        with self._lock:
+            self._buffer[(kind, record_id)] = row
+            overflow = len(self._buffer) >= self.max_buffer
+        if overflow:
+            # si ya hay un flush en curso no se espera: el próximo lo levanta
+            self.flush(blocking=False)
+
+    def flush(self, blocking: bool = True) -> int:
+        # un flush a la vez: el siguiente espera y encuentra lo que llegó mientras
+        if not self._db_lock.acquire(blocking):
+            return 0
+        try:
+            with self._lock:
+                batch, self._buffer = self._buffer, {}
+                self._writing = batch
+            if not batch:
+                return 0
+            try:
+                self._write(list(batch.values()))
+            except Exception:
+                # se reintenta en el próximo flush sin pisar registros más nuevos
+                with self._lock:
+                    for key, row in batch.items():
+                        self._buffer.setdefault(key, row)
+                raise
+            finally:
+                with self._lock:
+                    self._writing = {}
+            self.written += len(batch)
+            return len(batch)
+        finally:
+            self._db_lock.release()
+
+    def _write(self, rows: List[Tuple]):
+        with self._conn:
+            # upsert, salvo que pise un pedido ya entregado con una copia
+            # vieja (en modo cluster el worker y el dueño de las entregas
+            # archivan cada uno su copia del mismo pedido)
+            self._conn.executemany(
+                "INSERT INTO records (kind, record_id, phone, day, ts, data, num) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT (kind, record_id) DO UPDATE SET "
+                "phone = excluded.phone, day = excluded.day, ts = excluded.ts, data = excluded.data "
+                "WHERE json_extract(records.data, '$.status') IS NOT 'delivered' "
+                "OR json_extract(excluded.data, '$.status') = 'delivered'",
+                rows,
+            )
+
+    def close(self):
+        self.flush()
+        self._conn.close()
+
+    # ------------------------
+    # Consultas
+    # ------------------------
+    def get(self, kind: str, record_id: Any) -> Optional[dict]:
+        key = (kind, str(record_id))
+        with self._lock:
+            row = self._buffer.get(key) or self._writing.get(key)
+        if row is None:
+            with self._db_lock:
+                row = self._conn.execute(
+                    "SELECT kind, record_id, phone, day, ts, data FROM records "
+                    "WHERE kind = ? AND record_id = ?", key
+                ).fetchone()
+        return json.loads(row[5]) if row else None
+
+    def by_phone(self, phone: str, limit: int = 50) -> List[dict]:
+        self.flush()
+        with self._db_lock:
+            rows = self._conn.execute(
+                "SELECT data FROM records WHERE phone = ? ORDER BY ts DESC LIMIT ?",
+                (phone, limit),
+            ).fetchall()
+        return [json.loads(r[0]) for r in rows]
+
+    def by_day(self, day: str, kind: str = "order", limit: int = 1000) -> List[dict]:
+        """day en formato YYYY-MM-DD (hora local)."""
+        self.flush()
+        with self._db_lock:
+            rows = self._conn.execute(
+                "SELECT data FROM records WHERE kind = ? AND day = ? ORDER BY ts LIMIT ?",
+                (kind, day, limit),
+            ).fetchall()
+        return [json.loads(r[0]) for r in rows]
+
+    def max_record_id(self, kind: str) -> int:
+        """Mayor id numérico archivado (para no repetir ids tras reiniciar)."""
+        self.flush()
+        with self._db_lock:
+            row = self._conn.execute(
+                "SELECT MAX(num) FROM records WHERE kind = ?", (kind,)
+            ).fetchone()
+        return int(row[0] or 0)
+
+    def stats(self) -> dict:
+        with self._lock:
+            buffered = len(self._buffer)
+        return {"path": self.path, "buffered": buffered, "written": self.written}
+
+
+BASE_DIR = os.path.dirname(os.path.dirname(__file__))
+ORDER_ARCHIVE_PATH = os.getenv("ORDER_ARCHIVE_PATH", os.path.join(BASE_DIR, "data", "orders_archive.sqlite3"))
+
+# instancia global (compartida por CartManager y DeliveryManager)
+ORDER_ARCHIVE = OrderArchive(ORDER_ARCHIVE_PATH)
@@ -0,0 +1,136 @@
+# utils/outbound_dispatcher.py
+import asyncio
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional, Tuple
+
+
+class OutboundDispatcher:
+    """
+    Cola de envíos salientes en memoria con un pool de workers async.
+
+    - Entre destinatarios distintos los envíos van en paralelo.
+    - Para un mismo número el orden es estricto: solo un worker a la vez
+      tiene "tomado" ese número, y al terminar lo re-encola al final si
+      le quedan mensajes (reparto justo entre conversaciones).
+    """
+
+    def __init__(self, send_fn: Callable[[dict], Awaitable[Any]], workers: int = 8,
+                 latency_window: int = 512):
+        self.send_fn = send_fn
+        self.workers = workers
+
+        self._pending: Dict[str, Deque[Tuple[dict, float]]] = {}
+        self._ready: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+        self._depth = 0
+
+        # métricas
+        self.sent = 0
+        self.failed = 0
+        self._latencies: Deque[float] = deque(maxlen=latency_window)
+        self._latency_max = 0.0
+
+    # ------------------------
+    # Ciclo de vida
+    # ------------------------
+    @property
+    def running(self) -> bool:
+        return bool(self._tasks)
+
+    def start(self):
+        if self._tasks:
+            return
+        self._ready = asyncio.Queue()
+        # si quedó algo encolado antes del start, lo reactivamos
+        for number in self._pending:
+            self._ready.put_nowait(number)
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self, timeout: float = 5.0):
+        """Intenta vaciar la cola y luego corta los workers."""
+        if not self._tasks:
+            return
+        deadline = time.monotonic() + timeout
+        while self._depth and time.monotonic() < deadline:
+            await asyncio.sleep(0.05)
+        for t in self._tasks:
+            t.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self._ready = None
+
+    # ------------------------
+    # Encolar
+    # ------------------------
+    def enqueue(self, number: str, payload: dict):
+        item = (payload, time.monotonic())
+        self._depth += 1
+
+        q = self._pending.get(number)
+        if q is not None:
+            # ya está en la cola de listos o un worker lo está enviando
+            q.append(item)
+            return
+
+        self._pending[number] = deque([item])
+        if self._ready is not None:
+            self._ready.put_nowait(number)
+
+    # ------------------------
+    # Worker
+    # ------------------------
+    async def _worker(self):
+        while True:
+            number = await self._ready.get()
+            q = self._pending[number]
+            payload, enqueued_at = q.popleft()
+
+            try:
+                resp = await self.send_fn(payload)
+                if resp is None or getattr(resp, "status_code", 200) >= 400:
+                    self.failed += 1
+                else:
+                    self.sent += 1
+            except Exception as e:
+                self.failed += 1
+                print("❌ ERROR dispatcher saliente:", e)
+            finally:
+                self._depth -= 1
+                latency = time.monotonic() - enqueued_at
+                self._latencies.append(latency)
+                if latency > self._latency_max:
+                    self._latency_max = latency
+
+                if q:
+                    self._ready.put_nowait(number)
+                else:
+                    del self._pending[number]
+
+    # ------------------------
+    # Métricas
+    # ------------------------
+    def queue_depth(self) -> int:
+        return self._depth
+
+    def stats(self) -> dict:
+        lat = sorted(self._latencies)
+
+        def pct(p):
+            if not lat:
+                return None
+            return round(lat[min(len(lat) - 1, int(p * len(lat)))] * 1000, 1)
+
+        return {
+            "running": self.running,
+            "workers": self.workers,
+            "queue_depth": self._depth,
+            "recipients_pending": len(self._pending),
+            "sent": self.sent,
+            "failed": self.failed,
+            "latency_ms": {
+                "p50": pct(0.50),
+                "p95": pct(0.95),
+                "max": round(self._latency_max * 1000, 1),
+            },
+        }
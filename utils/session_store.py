@@ -0,0 +1,120 @@
+# utils/session_store.py
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    phone      TEXT PRIMARY KEY,
+    updated_at REAL NOT NULL,
+    data       TEXT NOT NULL
+);
+"""
+
+
+class SqliteSessionBackend:
+    """
+    Backend por defecto. Cualquier objeto con load(phone) -> dict | None y
+    write_many([(phone, updated_at, dict)]) sirve como reemplazo.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._conn.executescript(SCHEMA)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+
+    def load(self, phone: str) -> Optional[dict]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT data FROM sessions WHERE phone = ?", (phone,)
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def write_many(self, rows):
+        encoded = [(phone, ts, json.dumps(data, default=str)) for phone, ts, data in rows]
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO sessions (phone, updated_at, data) VALUES (?, ?, ?)",
+                encoded,
+            )
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class SessionStore:
+    """
+    Persistencia write-behind de sesiones (estado + carrito).
+
+    - mark_dirty(phone, snapshot): O(1) en memoria, nunca toca disco; si el
+      mismo usuario cambia varias veces entre flushes, queda la última foto.
+    - flush(): escribe todos los pendientes en una sola transacción. Se
+      llama periódicamente desde un thread (asyncio.to_thread).
+    - load(phone): lectura puntual, para hidratar al usuario la primera vez
+      que escribe después de un reinicio.
+    """
+
+    def __init__(self, backend):
+        self.backend = backend
+        self._dirty: Dict[str, Tuple[float, dict]] = {}
+        # lote que flush() está escribiendo: load() lo sigue viendo hasta el commit
+        self._writing: Dict[str, Tuple[float, dict]] = {}
+        self._lock = threading.Lock()
+        self.loaded = 0
+        self.written = 0
+
+    def load(self, phone: str) -> Optional[dict]:
+        with self._lock:
+            pending = self._dirty.get(phone) or self._writing.get(phone)
+        if pending is not None:
+            return pending[1]
+        data = self.backend.load(phone)
+        if data is not None:
+            self.loaded += 1
+        return data
+
+    def mark_dirty(self, phone: str, snapshot: dict):
+        with self._lock:
+            self._dirty[phone] = (time.time(), snapshot)
+
+    def flush(self) -> int:
+        with self._lock:
+            dirty, self._dirty = self._dirty, {}
+            self._writing = dirty
+        if not dirty:
+            return 0
+        try:
+            self.backend.write_many([(phone, ts, data) for phone, (ts, data) in dirty.items()])
+        except Exception:
+            # se reintenta en el próximo flush sin pisar cambios más nuevos
+            with self._lock:
+                for phone, entry in dirty.items():
+                    self._dirty.setdefault(phone, entry)
+            raise
+        finally:
+            with self._lock:
+                self._writing = {}
+        self.written += len(dirty)
+        return len(dirty)
+
+    def close(self):
+        self.flush()
+        self.backend.close()
+
+    def stats(self) -> dict:
+        with self._lock:
+            dirty = len(self._dirty)
+        return {"dirty": dirty, "loaded": self.loaded, "written": self.written}
+
+
+BASE_DIR = os.path.dirname(os.path.dirname(__file__))
+SESSION_DB_PATH = os.getenv("SESSION_DB_PATH", os.path.join(BASE_DIR, "data", "sessions.sqlite3"))
+
+# instancia global
+SESSION_STORE = SessionStore(SqliteSessionBackend(SESSION_DB_PATH))
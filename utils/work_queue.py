@@ -0,0 +1,104 @@
+# utils/work_queue.py
+import asyncio
+from collections import deque
+from typing import Any, Deque, List
+
+
+class SheddingQueue:
+    """
+    Cola FIFO acotada para eventos entrantes, con descarte por prioridad.
+
+    Se consume siempre en orden de llegada (la prioridad NO reordena, así
+    no se rompe el flujo de una conversación). La prioridad solo decide
+    qué se descarta cuando la cola está llena:
+      - si hay algo encolado de menor prioridad, se descarta el más viejo
+        de ese nivel y entra el nuevo;
+      - si no, se descarta el nuevo.
+
+    Nivel 0 = más importante. Todo es O(1) (borrado perezoso).
+
+    Como asyncio.Queue, cada get() se cierra con task_done(); unfinished()
+    cuenta lo encolado + lo que se está procesando (para vaciar al apagar).
+    """
+
+    def __init__(self, maxsize: int = 1000, levels: int = 3):
+        self.maxsize = maxsize
+        self.levels = levels
+
+        self._fifo: Deque[List] = deque()                 # [item, level, dropped]
+        self._by_level: List[Deque[List]] = [deque() for _ in range(levels)]
+        self._size = 0
+        self._unfinished = 0
+        self._available = asyncio.Semaphore(0)
+
+        self.accepted = 0
+        self.shed = [0] * levels
+
+    def __len__(self):
+        return self._size
+
+    def full(self) -> bool:
+        return self._size >= self.maxsize
+
+    def put_nowait(self, item: Any, priority: int) -> bool:
+        """Encola. Devuelve False si el evento fue descartado."""
+        priority = min(max(priority, 0), self.levels - 1)
+
+        if self._size >= self.maxsize:
+            victim_level = self._lowest_level_below(priority)
+            if victim_level is None:
+                self.shed[priority] += 1
+                return False
+
+            victim = self._by_level[victim_level].popleft()
+            victim[2] = True
+            self._size -= 1
+            self._unfinished -= 1
+            self.shed[victim_level] += 1
+            self._push(item, priority)
+            return True
+
+        self._push(item, priority)
+        self._available.release()
+        return True
+
+    def _push(self, item, priority):
+        entry = [item, priority, False]
+        self._fifo.append(entry)
+        self._by_level[priority].append(entry)
+        self._size += 1
+        self._unfinished += 1
+        self.accepted += 1
+
+    def _lowest_level_below(self, priority: int):
+        for level in range(self.levels - 1, priority, -1):
+            if self._by_level[level]:
+                return level
+        return None
+
+    async def get(self) -> Any:
+        await self._available.acquire()
+        while True:
+            entry = self._fifo.popleft()
+            if not entry[2]:
+                break
+
+        self._by_level[entry[1]].popleft()
+        self._size -= 1
+        return entry[0]
+
+    def task_done(self):
+        self._unfinished -= 1
+
+    def unfinished(self) -> int:
+        return self._unfinished
+
+    def stats(self) -> dict:
+        return {
+            "depth": self._size,
+            "unfinished": self._unfinished,
+            "maxsize": self.maxsize,
+            "depth_by_priority": [len(q) for q in self._by_level],
+            "accepted": self.accepted,
+            "shed_by_priority": list(self.shed),
+        }
@@ -1,23 +1,119 @@
-import requests
+import asyncio
 import os
 
-WHATSAPP_API_URL = f"https://graph.facebook.com/v20.0/{os.getenv('WHATSAPP_PHONE_ID')}/messages"
+import httpx
+
+from utils.outbound_dispatcher import OutboundDispatcher
+
+# WHATSAPP_API_URL permite apuntar a un mock local de la Graph API
+# (benchmarks/mock_graph.py; ver benchmarks/bench_outbound.py)
+WHATSAPP_API_URL = os.getenv(
+    "WHATSAPP_API_URL",
+    f"https://graph.facebook.com/v20.0/{os.getenv('WHATSAPP_PHONE_ID')}/messages"
+)
 WHATSAPP_TOKEN = os.getenv("WHATSAPP_ACCESS_TOKEN")
 
+# Pool de conexiones keep-alive compartido por todos los envíos
+HTTP_TIMEOUT = httpx.Timeout(10.0, connect=5.0)
+HTTP_LIMITS = httpx.Limits(max_connections=50, max_keepalive_connections=20, keepalive_expiry=60.0)
 
-def _post(payload):
-    headers = {
+_async_client: httpx.AsyncClient | None = None
+_sync_client: httpx.Client | None = None
+
+# referencias a los envíos en vuelo (si no, el GC puede cortar el Task)
+_inflight: set = set()
+
+
+def _http2_available() -> bool:
+    try:
+        import h2  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+def _headers():
+    return {
         "Authorization": f"Bearer {WHATSAPP_TOKEN}",
         "Content-Type": "application/json"
     }
-    return requests.post(WHATSAPP_API_URL, headers=headers, json=payload)
+
+
+def get_async_client() -> httpx.AsyncClient:
+    """Cliente async único (HTTP/2 si está instalado `h2`)."""
+    global _async_client
+    if _async_client is None or _async_client.is_closed:
+        _async_client = httpx.AsyncClient(
+            http2=_http2_available(),
+            headers=_headers(),
+            timeout=HTTP_TIMEOUT,
+            limits=HTTP_LIMITS,
+        )
+    return _async_client
+
+
+def get_sync_client() -> httpx.Client:
+    """Cliente sync para scripts / código fuera del event loop."""
+    global _sync_client
+    if _sync_client is None or _sync_client.is_closed:
+        _sync_client = httpx.Client(
+            http2=_http2_available(),
+            headers=_headers(),
+            timeout=HTTP_TIMEOUT,
+            limits=HTTP_LIMITS,
+        )
+    return _sync_client
+
+
+async def close_clients():
+    """Cierra los pools (se llama en el shutdown de la app)."""
+    global _async_client, _sync_client
+    if _async_client is not None:
+        await _async_client.aclose()
+        _async_client = None
+    if _sync_client is not None:
+        _sync_client.close()
+        _sync_client = None
+
+
+async def _apost(payload):
+    try:
+        return await get_async_client().post(WHATSAPP_API_URL, json=payload)
+    except httpx.HTTPError as e:
+        print("❌ ERROR enviando a WhatsApp:", e)
+        return None
+
+
+# Cola saliente: paralela entre destinatarios, ordenada por número
+OUTBOUND = OutboundDispatcher(_apost, workers=int(os.getenv("OUTBOUND_WORKERS", 8)))
+
+
+def _post(payload):
+    """
+    Dentro del event loop (webhook) NO bloquea: encola en OUTBOUND (o, si el
+    dispatcher no está corriendo, agenda el envío como task). Fuera del loop
+    hace el POST sync con el pool.
+    """
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        return get_sync_client().post(WHATSAPP_API_URL, json=payload)
+
+    if OUTBOUND.running:
+        OUTBOUND.enqueue(payload["to"], payload)
+        return None
+
+    task = loop.create_task(_apost(payload))
+    _inflight.add(task)
+    task.add_done_callback(_inflight.discard)
+    return task
 
 
 # ==========================================
 # ENVIAR TEXTO
 # ==========================================
-def send_whatsapp_text(number, message):
-    payload = {
+def _text_payload(number, message):
+    return {
         "messaging_product": "whatsapp",
         "recipient_type": "individual",
         "to": number,
@@ -26,14 +122,21 @@ def send_whatsapp_text(number, message):
             "body": message
         }
     }
-    return _post(payload)
+
+
+async def send_whatsapp_text_async(number, message):
+    return await _apost(_text_payload(number, message))
+
+
+def send_whatsapp_text(number, message):
+    return _post(_text_payload(number, message))
 
 
 # ==========================================
 # ENVIAR LIST MESSAGE
 # ==========================================
-def send_whatsapp_list(number, header, body, sections):
-    payload = {
+def _list_payload(number, header, body, sections):
+    return {
         "messaging_product": "whatsapp",
         "recipient_type": "individual",
         "to": number,
@@ -48,13 +151,20 @@ def send_whatsapp_list(number, header, body, sections):
             }
         }
     }
-    return _post(payload)
+
+
+async def send_whatsapp_list_async(number, header, body, sections):
+    return await _apost(_list_payload(number, header, body, sections))
+
+
+def send_whatsapp_list(number, header, body, sections):
+    return _post(_list_payload(number, header, body, sections))
 
 
 # ==========================================
 # ENVIAR BOTONES — CORRECTO PARA 2025
 # ==========================================
-def send_whatsapp_buttons(number, header, body, buttons):
+def _buttons_payload(number, header, body, buttons):
     """
     buttons debe ser una lista:
     [
@@ -62,7 +172,7 @@ def send_whatsapp_buttons(number, header, body, buttons):
         {"id": "btn_carrito", "title": "Ver carrito"}
     ]
     """
-    payload = {
+    return {
         "messaging_product": "whatsapp",
         "recipient_type": "individual",
         "to": number,
@@ -91,4 +201,10 @@ def send_whatsapp_buttons(number, header, body, buttons):
         }
     }
 
-    return _post(payload)
+
+async def send_whatsapp_buttons_async(number, header, body, buttons):
+    return await _apost(_buttons_payload(number, header, body, buttons))
+
+
+def send_whatsapp_buttons(number, header, body, buttons):
+    return _post(_buttons_payload(number, header, body, buttons))